@@ -31,6 +31,19 @@ ALLOWED_MEAL_TYPES = {'breakfast', 'lunch', 'dinner', 'snack', 'morning snack',
 MAX_MEALS_PER_REQUEST = 50
 MAX_CACHE_SIZE = 1000
 
+# User diet values -> CSV "Diet" column values
+DIET_MAPPING = {
+    'veg': 'Vegetarian',
+    'vegetarian': 'Vegetarian',
+    'non-veg': 'Non-Vegetarian',
+    'non-vegetarian': 'Non-Vegetarian',
+    'vegan': 'Vegan',
+    'jain': 'Jain',
+    'eggitarian': 'Eggitarian',
+    'keto': 'Keto',
+    'mixed': 'Mixed'
+}
+
 # AI Configuration
 OPENROUTER_API_KEY = os.getenv('OPENROUTER_API_KEY')
 AI_AVAILABLE = bool(OPENROUTER_API_KEY)
@@ -493,18 +506,7 @@ async def generate_ingredient_based_meal_plan(user_data: Dict[str, Any], ingredi
         name = user_data.get('name', 'User')
         
         # Normalize diet type
-        diet_mapping = {
-            'veg': 'Vegetarian',
-            'vegetarian': 'Vegetarian',
-            'non-veg': 'Non-Vegetarian',
-            'non-vegetarian': 'Non-Vegetarian',
-            'vegan': 'Vegan',
-            'jain': 'Jain',
-            'eggitarian': 'Eggitarian',
-            'keto': 'Keto',
-            'mixed': 'Mixed'
-        }
-        csv_diet_type = diet_mapping.get(diet_type, 'Vegetarian')
+        csv_diet_type = DIET_MAPPING.get(diet_type, 'Vegetarian')
         
         # 🔥 STEP 1: Search ALL static files for perfect matches
         all_meals = []
@@ -861,8 +863,8 @@ def generate_fallback_ingredient_response(ingredients: str, diet_type: str, stat
         if len(similar) > 1:  # If we have variations
             suggestions.extend(similar[:3])  # Take first 3 variations
     
-    # Remove duplicates and limit suggestions
-    unique_suggestions = list(set(suggestions))[:8]
+    # Remove duplicates (first occurrence wins, so the user's ingredient order is kept) and limit suggestions
+    unique_suggestions = list(dict.fromkeys(suggestions))[:8]
     
     return f"""No Perfect {meal_type.title()} Matches Found
 
@@ -7,15 +7,19 @@ Built with python-telegram-bot v20+ and Firebase integration
 
 import logging
 import asyncio
+import bisect
+import io
 import json
 import random
 import os
 import re
 import csv
-from typing import Dict, Any, Optional, List
-from urllib.parse import quote
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from urllib.parse import quote, urlencode
+from itertools import zip_longest
 from pathlib import Path
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
 
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import (
@@ -43,7 +47,7 @@ except ImportError:
 
 # Static Meal Generator imports
 try:
-    from ai_meal_generator import generate_ai_meal_plan, get_fallback_meal_message
+    from ai_meal_generator import generate_ai_meal_plan, get_fallback_meal_message, generate_ingredient_based_meal_plan
     MEAL_GENERATOR_AVAILABLE = True
 except ImportError:
     MEAL_GENERATOR_AVAILABLE = False
@@ -80,11 +84,51 @@ NAME, AGE, GENDER, STATE, DIET_TYPE, MEDICAL_CONDITION, ACTIVITY_LEVEL, MEAL_PLA
 
 # In-memory cache for performance (with size limits)
 MAX_CACHE_SIZE = 1000
+MEAL_CACHE_TTL = 3600  # 1 hour - CSV meal data is static per deployment
 user_data_cache: Dict[int, Dict[str, Any]] = {}
+user_profile_fetched_at: Dict[int, float] = {}  # Saved/loaded profiles only; drafts have no entry
+profile_refresh_tasks: Dict[int, asyncio.Task] = {}
+PROFILE_FRESH_TTL = 300  # 5 minutes - serve from cache without revalidating
+PROFILE_STALE_TTL = 3600  # 1 hour - serve stale and refresh in background until then
+missing_profile_checked_at: Dict[int, float] = {}  # Users Firebase had no profile for
+MISSING_PROFILE_TTL = 60  # 1 minute - answer "no profile" from memory before asking Firebase again
 grocery_lists_cache: Dict[int, List[str]] = {}
 user_cart_cache: Dict[int, set] = {}
 user_streaks_cache: Dict[int, Dict[str, Any]] = {}
-meal_data_cache: Dict[str, List[Dict[str, Any]]] = {}
+pending_writes: Dict[Tuple[Any, int], Tuple[asyncio.Task, Any]] = {}  # (writer, user_id) -> (debounce task, value to write)
+WRITE_DEBOUNCE_SECONDS = 0.5  # Coalesce rapid grocery/cart taps into one write
+pending_markup_edits: Dict[Tuple[int, int], asyncio.Task] = {}  # (chat_id, message_id) -> debounced keyboard edit
+MARKUP_EDIT_DEBOUNCE_SECONDS = 0.1  # Coalesce rapid toggle taps into one keyboard edit
+meal_data_cache: Dict[Tuple[Optional[str], Optional[str], Optional[str], int], Tuple[float, Tuple[Dict[str, Any], ...], Dict[str, Tuple[Dict[str, Any], ...]]]] = {}
+
+suggestion_cache: Dict[Tuple[str, str, Optional[str]], Tuple[float, Tuple[str, ...]]] = {}
+SUGGESTION_CACHE_TTL = 300  # 5 minutes - grocery suggestions shared by the grocery, add-items and Zepto screens
+filtered_meals_cache: Dict[Tuple[int, str, str], Tuple[Any, Tuple[Dict[str, Any], ...]]] = {}
+
+# Meal categories used to assemble a full day plan (CSV "Meal" column values)
+MEAL_CATEGORY_NAMES = ('Breakfast', 'Lunch', 'Dinner', 'Evening Snack', 'Morning Snack')
+MEAL_CATEGORY_CANDIDATES = 5  # Random candidates kept per category when categorizing per request
+MEAL_TYPES_ORDER = ('Breakfast', 'Lunch', 'Dinner', 'Evening Snack')  # Full day plan slots
+MEAL_TYPES_DISPLAY = ('Breakfast', 'Lunch', 'Dinner', 'Snack')
+LOG_MEAL_TYPES = ('breakfast', 'lunch', 'dinner', 'snack')  # Meal logging steps
+
+# User diet values -> CSV "Diet" column values
+DIET_MAPPING = {
+    'veg': 'Vegetarian',
+    'vegetarian': 'Vegetarian',
+    'non-veg': 'Non-Vegetarian',
+    'non-vegetarian': 'Non-Vegetarian',
+    'vegan': 'Vegan',
+    'jain': 'Jain',
+    'eggitarian': 'Eggitarian',
+    'keto': 'Keto',
+    'mixed': 'Mixed'
+}
+
+# Common ingredients that might be in AI meal names (Zepto search fallback)
+COMMON_INGREDIENTS = frozenset(("Rice", "Dal", "Vegetables", "Potato", "Tomato", "Onion", "Oil", "Spices"))
+COMMON_INGREDIENTS_SORTED = tuple(sorted(COMMON_INGREDIENTS))
+COMMON_INGREDIENT_KEYWORDS = tuple((name.lower(), name) for name in COMMON_INGREDIENTS_SORTED)  # (needle, name)
 
 # Navigation stack for proper back navigation
 user_navigation_stack: Dict[int, List[Dict[str, Any]]] = {}
@@ -158,6 +202,19 @@ async def create_test_data():
         logger.error(f"❌ Error creating test data: {e}")
         return False
 
+# Precompiled regex patterns (compiled once at import, used per request/CSV row)
+UNSAFE_CHARS_PATTERN = re.compile(r'[<>"\']')
+VALID_NAME_PATTERN = re.compile(r'^[a-zA-Z0-9\s\.\-\']+$')
+NON_DIGIT_PATTERN = re.compile(r'[^\d]')
+QUANTITY_PATTERN = re.compile(r'\d+g|\d+ml|\d+kg|\d+mg')
+QUANTITY_PERCENT_PATTERN = re.compile(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%')
+BOT_TOKEN_PATTERN = re.compile(r'^\d+:[A-Za-z0-9_-]+$')  # <numeric bot id>:<secret>
+# Single alternation so each CSV field is scanned once instead of once per pattern
+SUSPICIOUS_CONTENT_PATTERN = re.compile('|'.join((
+    r'<script', r'javascript:', r'data:', r'vbscript:', r'onload=',
+    r'<iframe', r'<object', r'<embed', r'<form', r'<input'
+)), re.IGNORECASE)
+
 # Input validation functions
 def sanitize_input(text: str, max_length: int = 200) -> str:
     """Sanitize user input to prevent injection attacks."""
@@ -165,7 +222,7 @@ def sanitize_input(text: str, max_length: int = 200) -> str:
         return ""
     
     # Remove potentially dangerous characters
-    sanitized = re.sub(r'[<>"\']', '', text.strip())
+    sanitized = UNSAFE_CHARS_PATTERN.sub('', text.strip())
     
     # Limit length
     if len(sanitized) > max_length:
@@ -179,7 +236,7 @@ def validate_name(name: str) -> bool:
         return False
     
     # Check for valid characters (letters, numbers, spaces, common punctuation)
-    if not re.match(r'^[a-zA-Z0-9\s\.\-\']+$', name):
+    if not VALID_NAME_PATTERN.match(name):
         return False
     
     return True
@@ -188,7 +245,7 @@ def validate_age(age_text: str) -> Optional[int]:
     """Validate age input."""
     try:
         # Remove non-numeric characters
-        clean_age = re.sub(r'[^\d]', '', age_text)
+        clean_age = NON_DIGIT_PATTERN.sub('', age_text)
         if not clean_age:
             return None
         
@@ -219,6 +276,14 @@ def cleanup_cache(cache: Dict, max_size: int = MAX_CACHE_SIZE):
         except Exception as clear_error:
             logger.error(f"Failed to clear cache: {clear_error}")
 
+def cleanup_profile_cache():
+    """Bound the profile cache and drop fetch timestamps of evicted profiles, keeping the two in step."""
+    size = len(user_data_cache)
+    cleanup_cache(user_data_cache)
+    if len(user_data_cache) < size:
+        for user_id in [uid for uid in user_profile_fetched_at if uid not in user_data_cache]:
+            del user_profile_fetched_at[user_id]
+
 # Navigation helper functions
 def add_to_navigation_stack(user_id: int, current_state: str, context_data: Dict[str, Any] = None):
     """Add current state to user's navigation stack."""
@@ -261,6 +326,100 @@ def get_navigation_path(user_id: int) -> List[str]:
     
     return [entry['state'] for entry in user_navigation_stack[user_id]]
 
+# Static keyboards with no per-user data, built once at import
+START_OVER_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
+]])
+GO_BACK_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")
+]])
+TRY_AGAIN_MARKUP = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔄 Try Again", callback_data="get_meal_plan")
+]])
+MAIN_MENU_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🍽️ Get Daily Meal Plan", callback_data="get_meal_plan")],
+    [InlineKeyboardButton("🥘 Suggest from Ingredients", callback_data="ingredient_meal")],
+    [InlineKeyboardButton("📝 Log Today's Meals", callback_data="log_meal")],
+    [InlineKeyboardButton("📅 Weekly Meal Plan", callback_data="week_plan")],
+    [InlineKeyboardButton("🛒 Grocery List", callback_data="grocery_list")],
+    [InlineKeyboardButton("👤 View Profile", callback_data="view_profile")],
+    [InlineKeyboardButton("🔄 Update Profile", callback_data="update_profile")]
+])
+START_PROFILE_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✅ Start Profile Creation", callback_data="start_profile")]
+])
+GENDER_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("👨 Male", callback_data="gender_male")],
+    [InlineKeyboardButton("👩 Female", callback_data="gender_female")]
+])
+MEAL_PLAN_OPTIONS_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🍽️ Daily Meal Plan", callback_data="quick_meal_plan")],
+    [InlineKeyboardButton("🌅 Breakfast", callback_data="meal_plan_type_breakfast")],
+    [InlineKeyboardButton("☀️ Lunch", callback_data="meal_plan_type_lunch")],
+    [InlineKeyboardButton("🌙 Dinner", callback_data="meal_plan_type_dinner")],
+    [InlineKeyboardButton("🍎 Snack", callback_data="meal_plan_type_snack")],
+    [InlineKeyboardButton("⬅️ Back", callback_data="navigate_back")]
+])
+STREAK_HELP_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("👤 Back to Profile", callback_data="view_profile")],
+    [InlineKeyboardButton("🍽️ Get Meal Plan", callback_data="get_meal_plan")]
+])
+EMPTY_CART_MARKUP = InlineKeyboardMarkup([
+    [InlineKeyboardButton("👤 View Profile", callback_data="view_profile")],
+    [InlineKeyboardButton("🛒 Back to Shopping List", callback_data="grocery_list")],
+    [InlineKeyboardButton("⬅️ Back to Meal Plan", callback_data="get_meal_plan")]
+])
+
+# Shared "no profile" reply
+NO_PROFILE_TEXT = "❌ No profile found. Please create your profile first."
+
+async def smart_reply(update: Update, text: str, reply_markup=None, parse_mode: Optional[str] = None):
+    """Edit the message behind a button press, or reply to a typed command."""
+    if update.callback_query:
+        return await update.callback_query.edit_message_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+    return await update.message.reply_text(text, reply_markup=reply_markup, parse_mode=parse_mode)
+
+def record_rendered_screen(context: ContextTypes.DEFAULT_TYPE, message, screen: Optional[str] = None, selection=()):
+    """Record which toggle screen and selection a message now shows (screen=None for any other screen)."""
+    key = (message.chat_id, message.message_id)
+    # A keyboard edit still pending for the previous screen must not land on this one
+    pending = pending_markup_edits.pop(key, None)
+    if pending:
+        pending.cancel()
+    if screen is None:
+        context.user_data.pop("rendered_selection", None)
+    else:
+        context.user_data["rendered_selection"] = (key, screen, frozenset(selection))
+
+def schedule_markup_edit(query, context: ContextTypes.DEFAULT_TYPE, screen: str, selection: set, reply_markup: InlineKeyboardMarkup):
+    """Debounce a toggle keyboard edit: only the last tap within MARKUP_EDIT_DEBOUNCE_SECONDS is sent."""
+    key = (query.message.chat_id, query.message.message_id)
+    pending = pending_markup_edits.get(key)
+    if pending:
+        pending.cancel()
+    pending_markup_edits[key] = asyncio.create_task(
+        run_markup_edit(query, context, key, (key, screen, frozenset(selection)), reply_markup)
+    )
+
+async def run_markup_edit(query, context: ContextTypes.DEFAULT_TYPE, key: Tuple[int, int], rendered: Tuple, reply_markup: InlineKeyboardMarkup):
+    """Wait out the debounce window, then edit the keyboard unless the selection shown is unchanged."""
+    await asyncio.sleep(MARKUP_EDIT_DEBOUNCE_SECONDS)
+    pending_markup_edits.pop(key, None)
+    
+    # A select/deselect double tap nets out to the keyboard already on screen
+    if context.user_data.get("rendered_selection") == rendered:
+        return
+    try:
+        await query.edit_message_reply_markup(reply_markup=reply_markup)
+        context.user_data["rendered_selection"] = rendered
+    except Exception as e:
+        logger.warning(f"Could not update keyboard for message {key}: {e}")
+
+async def send_no_profile(query) -> int:
+    """Tell the user to create a profile first and end the conversation."""
+    await query.edit_message_text(NO_PROFILE_TEXT, reply_markup=START_OVER_MARKUP)
+    return ConversationHandler.END
+
 # Firebase helper functions with proper error handling
 async def save_user_profile(user_id: int, profile_data: Dict[str, Any]) -> bool:
     """Save user profile to Firebase with proper error handling and retry mechanism."""
@@ -274,7 +433,9 @@ async def save_user_profile(user_id: int, profile_data: Dict[str, Any]) -> bool:
     
     # Update cache immediately for better performance
     user_data_cache[user_id] = sanitized_profile.copy()
-    cleanup_cache(user_data_cache)
+    user_profile_fetched_at[user_id] = time.monotonic()
+    missing_profile_checked_at.pop(user_id, None)
+    cleanup_profile_cache()
     
     # Save to Firebase (now compulsory) with retry mechanism
     max_retries = 3
@@ -298,47 +459,137 @@ async def save_user_profile(user_id: int, profile_data: Dict[str, Any]) -> bool:
     
     return False
 
+async def fetch_user_profile(user_id: int) -> Optional[Dict[str, Any]]:
+    """Load user profile from Firebase and refresh the cache entry."""
+    started_at = time.monotonic()
+    doc_ref = db.collection('users').document(str(user_id))
+    doc = await asyncio.to_thread(doc_ref.get)  # Blocking RPC off the event loop
+    data = doc.to_dict() if doc.exists else {}
+    profile_data = data.get('profile')
+    if not profile_data:
+        return None
+    
+    # Streak data lives in the same document - prime its cache so get_user_streak skips a second read
+    if user_id not in user_streaks_cache:
+        user_streaks_cache[user_id] = data.get('streak_data', {
+            'streak_count': 0,
+            'last_completed_date': None,
+            'streak_points_total': 0
+        })
+        cleanup_cache(user_streaks_cache)
+    
+    # Don't overwrite a profile saved while this read was in flight
+    if user_profile_fetched_at.get(user_id, 0) <= started_at:
+        user_data_cache[user_id] = profile_data
+        user_profile_fetched_at[user_id] = time.monotonic()
+        cleanup_profile_cache()
+    logger.info(f"Profile loaded from Firebase for user {user_id}")
+    return user_data_cache.get(user_id, profile_data)
+
+async def refresh_user_profile(user_id: int):
+    """Revalidate a stale cached profile in the background."""
+    try:
+        await fetch_user_profile(user_id)
+    except Exception as e:
+        logger.warning(f"Background profile refresh failed for user {user_id}: {e}")
+    finally:
+        profile_refresh_tasks.pop(user_id, None)
+
 async def get_user_profile(user_id: int) -> Optional[Dict[str, Any]]:
-    """Get user profile from cache or Firebase with proper error handling."""
+    """Get user profile from cache or Firebase, revalidating stale entries (stale-while-revalidate)."""
     # Check cache first
-    if user_id in user_data_cache:
-        logger.info(f"Profile found in cache for user {user_id}")
-        return user_data_cache[user_id]
+    cached_profile = user_data_cache.get(user_id)
+    if cached_profile is not None:
+        fetched_at = user_profile_fetched_at.get(user_id)
+        # Timestamps are only evicted with their profile, so a missing one means an unsaved draft
+        age = time.monotonic() - fetched_at if fetched_at is not None else 0
+        if age < PROFILE_FRESH_TTL:
+            logger.info(f"Profile found in cache for user {user_id}")
+            return cached_profile
+        if age < PROFILE_STALE_TTL:
+            # Serve stale data now, refresh once in the background
+            if user_id not in profile_refresh_tasks:
+                profile_refresh_tasks[user_id] = asyncio.create_task(refresh_user_profile(user_id))
+            logger.info(f"Serving stale cached profile for user {user_id}")
+            return cached_profile
+    
+    # Firebase recently had no profile for this user - don't re-read it on every tap
+    checked_at = missing_profile_checked_at.get(user_id)
+    if cached_profile is None and checked_at is not None and time.monotonic() - checked_at < MISSING_PROFILE_TTL:
+        return None
     
     # Try Firebase (now compulsory)
     try:
-        doc_ref = db.collection('users').document(str(user_id))
-        doc = doc_ref.get()
-        if doc.exists:
-            data = doc.to_dict()
-            profile_data = data.get('profile')
-            if profile_data:
-                # Cache for future access
-                user_data_cache[user_id] = profile_data
-                cleanup_cache(user_data_cache)
-                logger.info(f"Profile loaded from Firebase for user {user_id}")
-                return profile_data
+        profile_data = await fetch_user_profile(user_id)
+        if profile_data:
+            missing_profile_checked_at.pop(user_id, None)
+            return profile_data
     except Exception as e:
+        if cached_profile is not None:
+            logger.warning(f"Firebase unavailable, using expired cached profile for user {user_id}: {e}")
+            return cached_profile
         logger.error(f"Error getting user profile from Firebase: {e}")
         raise Exception(f"Failed to get user profile from Firebase: {e}")
     
     logger.info(f"No profile found for user {user_id}")
+    missing_profile_checked_at[user_id] = time.monotonic()
+    cleanup_cache(missing_profile_checked_at)
     return None
 
-async def save_grocery_list(user_id: int, grocery_list: List[str]) -> bool:
-    """Save grocery list to Firebase with proper error handling."""
-    # Sanitize grocery list
-    sanitized_list = [sanitize_input(item, 100) for item in grocery_list if item.strip()]
-    
-    # Update cache
+def schedule_write(writer, user_id: int, value):
+    """Debounce writer(user_id, value): run it once no new write is scheduled for WRITE_DEBOUNCE_SECONDS."""
+    key = (writer, user_id)
+    pending = pending_writes.get(key)
+    if pending:
+        pending[0].cancel()
+    # The value is held here, not just in the cache, so cache eviction can't drop an unsaved edit
+    pending_writes[key] = (asyncio.create_task(run_scheduled_write(writer, user_id, value)), value)
+
+async def run_scheduled_write(writer, user_id: int, value):
+    """Wait out the debounce window, then persist the value."""
+    await asyncio.sleep(WRITE_DEBOUNCE_SECONDS)
+    pending_writes.pop((writer, user_id), None)
+    await writer(user_id, value)
+
+async def flush_write(writer, user_id: int):
+    """Run a pending debounced write right away."""
+    pending = pending_writes.pop((writer, user_id), None)
+    if pending:
+        pending[0].cancel()
+        await writer(user_id, pending[1])
+
+def get_pending_value(writer, user_id: int):
+    """Get the value a debounced write has yet to persist, or None."""
+    pending = pending_writes.get((writer, user_id))
+    return pending[1] if pending else None
+
+def cache_grocery_list(user_id: int, grocery_list: List[str]) -> List[str]:
+    """Sanitize grocery list and store it in the cache, sorted for bisect lookups."""
+    # Sanitizing can reorder items, so sort afterwards
+    sanitized_list = sorted(filter(None, (sanitize_input(item, 100) for item in grocery_list)))
     grocery_lists_cache[user_id] = sanitized_list
     cleanup_cache(grocery_lists_cache)
-    
+    return sanitized_list
+
+async def save_grocery_list(user_id: int, grocery_list: List[str]) -> bool:
+    """Save grocery list to cache and Firebase with proper error handling."""
+    # This write supersedes any debounced one, which would otherwise land later with an older list
+    pending = pending_writes.pop((persist_grocery_list, user_id), None)
+    if pending:
+        pending[0].cancel()
+    return await persist_grocery_list(user_id, cache_grocery_list(user_id, grocery_list))
+
+def schedule_grocery_list_save(user_id: int, grocery_list: List[str]):
+    """Update cached grocery list now and coalesce the Firebase write with other quick edits."""
+    schedule_write(persist_grocery_list, user_id, cache_grocery_list(user_id, grocery_list))
+
+async def persist_grocery_list(user_id: int, sanitized_list: List[str]) -> bool:
+    """Write a sanitized grocery list to Firebase."""
     # Save to Firebase if available
     if FIREBASE_AVAILABLE and db:
         try:
             doc_ref = db.collection('users').document(str(user_id))
-            doc_ref.update({
+            await asyncio.to_thread(doc_ref.update, {
                 'grocery_list': sanitized_list,
                 'updated_at': firestore.SERVER_TIMESTAMP
             })
@@ -357,6 +608,13 @@ async def get_grocery_list(user_id: int) -> List[str]:
     if user_id in grocery_lists_cache:
         return grocery_lists_cache[user_id]
     
+    # An edit still waiting on its debounced write is newer than Firebase
+    pending_list = get_pending_value(persist_grocery_list, user_id)
+    if pending_list is not None:
+        grocery_lists_cache[user_id] = pending_list
+        cleanup_cache(grocery_lists_cache)
+        return pending_list
+    
     # Try Firebase if available
     if FIREBASE_AVAILABLE and db:
         try:
@@ -364,7 +622,7 @@ async def get_grocery_list(user_id: int) -> List[str]:
             doc = doc_ref.get()
             if doc.exists:
                 data = doc.to_dict()
-                grocery_list = data.get('grocery_list', [])
+                grocery_list = sorted(data.get('grocery_list', []))  # Kept sorted for bisect lookups
                 # Cache for future access
                 grocery_lists_cache[user_id] = grocery_list
                 cleanup_cache(grocery_lists_cache)
@@ -374,20 +632,22 @@ async def get_grocery_list(user_id: int) -> List[str]:
     
     return []
 
-async def save_cart_selections(user_id: int, cart_items: set) -> bool:
-    """Save cart selections to Firebase."""
-    # Convert set to list for Firebase storage
-    cart_list = list(cart_items)
-    
-    # Update cache
+def schedule_cart_selections_save(user_id: int, cart_items: set):
+    """Update cached cart now and coalesce the Firebase write with other quick toggles."""
     user_cart_cache[user_id] = cart_items
     cleanup_cache(user_cart_cache)
+    schedule_write(persist_cart_selections, user_id, cart_items)
+
+async def persist_cart_selections(user_id: int, cart_items: set) -> bool:
+    """Write cart selections to Firebase."""
+    # Convert set to list for Firebase storage
+    cart_list = list(cart_items)
     
     # Save to Firebase if available
     if FIREBASE_AVAILABLE and db:
         try:
             doc_ref = db.collection('users').document(str(user_id))
-            doc_ref.update({
+            await asyncio.to_thread(doc_ref.update, {
                 'cart_selections': cart_list,
                 'updated_at': firestore.SERVER_TIMESTAMP
             })
@@ -405,6 +665,13 @@ async def get_cart_selections(user_id: int) -> set:
     if user_id in user_cart_cache:
         return user_cart_cache[user_id]
     
+    # A toggle still waiting on its debounced write is newer than Firebase
+    pending_cart = get_pending_value(persist_cart_selections, user_id)
+    if pending_cart is not None:
+        user_cart_cache[user_id] = pending_cart
+        cleanup_cache(user_cart_cache)
+        return pending_cart
+    
     # Try Firebase if available
     if FIREBASE_AVAILABLE and db:
         try:
@@ -435,7 +702,7 @@ async def save_meal_rating(user_id: int, meal_name: str, rating: int, feedback:
         sanitized_feedback = sanitize_input(feedback, 500)
         
         doc_ref = db.collection('ratings').document()
-        doc_ref.set({
+        await asyncio.to_thread(doc_ref.set, {
             'user_id': str(user_id),
             'meal_name': sanitized_meal_name,
             'rating': rating,  # 1 for 👍, 0 for 👎
@@ -465,9 +732,21 @@ def calculate_streak_points(streak_count: int) -> int:
         days_over_3 = streak_count - 3
         return int(base_points * (multiplier ** days_over_3))
 
+# [today's date, timestamp of next local midnight] - refreshed only when the day rolls over
+today_cache: List[Any] = [None, 0.0]
+
+def today_cached() -> date:
+    """Get today's local date, rebuilding it only after midnight."""
+    now = time.time()
+    if now >= today_cache[1]:
+        today = date.fromtimestamp(now)
+        today_cache[0] = today
+        today_cache[1] = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+    return today_cache[0]
+
 async def update_user_streak(user_id: int) -> Dict[str, Any]:
     """Update user streak and return streak info with proper Firebase persistence."""
-    today = datetime.now().date()
+    today = today_cached()
     
     # Get current streak data
     streak_data = await get_user_streak(user_id)
@@ -507,7 +786,7 @@ async def update_user_streak(user_id: int) -> Dict[str, Any]:
     if FIREBASE_AVAILABLE and db:
         try:
             doc_ref = db.collection('users').document(str(user_id))
-            doc_ref.update({
+            await asyncio.to_thread(doc_ref.update, {
                 'streak_data': streak_data,
                 'updated_at': firestore.SERVER_TIMESTAMP
             })
@@ -527,7 +806,7 @@ async def get_user_streak(user_id: int) -> Dict[str, Any]:
     if FIREBASE_AVAILABLE and db:
         try:
             doc_ref = db.collection('users').document(str(user_id))
-            doc = doc_ref.get()
+            doc = await asyncio.to_thread(doc_ref.get)  # Blocking RPC off the event loop
             if doc.exists:
                 data = doc.to_dict()
                 streak_data = data.get('streak_data', {
@@ -552,7 +831,16 @@ async def get_user_streak(user_id: int) -> Dict[str, Any]:
     cleanup_cache(user_streaks_cache)
     return default_streak
 
-def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type: str = None, max_meals: int = MAX_MEALS_PER_REQUEST) -> List[Dict[str, Any]]:
+async def get_profile_and_streak(user_id: int) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Get the user's profile and streak data, or (None, None) if there is no profile."""
+    # Not gathered: a cold profile read primes the streak cache from the same document,
+    # so awaiting in order costs one Firebase read where running both in parallel would cost two
+    user_data = await get_user_profile(user_id)
+    if not user_data:
+        return None, None
+    return user_data, await get_user_streak(user_id)
+
+def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type: str = None, max_meals: int = MAX_MEALS_PER_REQUEST, use_fallback: bool = True) -> List[Dict[str, Any]]:
     """
     Load meal data from CSV files based on user's state with enhanced security measures and filtering.
     
@@ -561,6 +849,7 @@ def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type:
         diet_type: Filter by diet type (optional)
         meal_type: Filter by meal type (optional)
         max_meals: Maximum number of meals to return (security limit)
+        use_fallback: Return fallback meals (rather than an empty list) when the CSV can't be read or has no matches
         
     Returns:
         List of meal dictionaries
@@ -588,13 +877,13 @@ def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type:
         
         if not csv_path.exists():
             logger.error(f"CSV file not found: {csv_path}")
-            return get_fallback_meal_data(state or "general")
+            return get_fallback_meal_data(state or "general") if use_fallback else []
         
         # Security: Check file size
         file_size_mb = csv_path.stat().st_size / (1024 * 1024)
         if file_size_mb > MAX_FILE_SIZE_MB:
             logger.error(f"CSV file too large: {file_size_mb:.2f}MB (max: {MAX_FILE_SIZE_MB}MB)")
-            return get_fallback_meal_data(state or "general")
+            return get_fallback_meal_data(state or "general") if use_fallback else []
         
         # Security: Validate input parameters
         if diet_type and diet_type.lower() not in ALLOWED_DIET_TYPES:
@@ -609,15 +898,11 @@ def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type:
             max_meals = MAX_MEALS_PER_REQUEST
             logger.warning(f"Max meals limited to {MAX_MEALS_PER_REQUEST}")
         
-        # Check cache first
-        cache_key = f"{state}_{diet_type}_{meal_type}_{max_meals}"
-        if cache_key in meal_data_cache:
-            logger.info(f"Returning cached meal data for key: {cache_key}")
-            return meal_data_cache[cache_key]
-        
         meals = []
         meals_found = 0
         invalid_rows = 0
+        diet_filter = diet_type.lower() if diet_type else None
+        meal_filter = meal_type.lower() if meal_type else None
         
         try:
             with open(csv_path, 'r', encoding='utf-8') as file:
@@ -633,22 +918,14 @@ def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type:
                         logger.warning("Reached safety limit of 10,000 rows, stopping processing")
                         break
                     
-                    # Security: Validate row data
-                    if not validate_csv_row(row):
-                        invalid_rows += 1
-                        if invalid_rows > 100:  # Stop if too many invalid rows
-                            logger.error("Too many invalid rows in CSV, stopping processing")
-                            break
-                        continue
-                    
-                    # Apply filters with debug logging
-                    if diet_type and row.get('Diet Type', '').lower() != diet_type.lower():
+                    # Apply the cheap column filters first so only candidate rows get validated
+                    if diet_filter and row.get('Diet Type', '').lower() != diet_filter:
                         logger.debug(f"❌ Diet filter: CSV={row.get('Diet Type', '')}, Requested={diet_type}")
                         continue
                     
-                    if meal_type:
+                    if meal_filter:
                         csv_meal = row.get('Meal', '').lower()
-                        requested_meal = meal_type.lower()
+                        requested_meal = meal_filter
                         
                         # Simplified meal type matching
                         meal_passed = False
@@ -667,6 +944,14 @@ def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type:
                             logger.debug(f"❌ Meal filter: CSV={csv_meal}, Requested={requested_meal}")
                             continue
                     
+                    # Security: Validate row data
+                    if not validate_csv_row(row):
+                        invalid_rows += 1
+                        if invalid_rows > 100:  # Stop if too many invalid rows
+                            logger.error("Too many invalid rows in CSV, stopping processing")
+                            break
+                        continue
+                    
                     # Convert CSV row to standard meal format
                     meal = convert_csv_row_to_meal(row)
                     if meal:
@@ -690,19 +975,89 @@ def load_meal_data_from_csv(state: str = None, diet_type: str = None, meal_type:
             except Exception as e:
                 logger.error(f"Failed to read CSV with latin-1 encoding: {e}")
         
-        # Cache the results
-        if len(meals) > 0:
-            meal_data_cache[cache_key] = meals
-            # Clean cache if too large
-            if len(meal_data_cache) > MAX_CACHE_SIZE:
-                cleanup_cache(meal_data_cache)
-        
         logger.info(f"Loaded {len(meals)} meals from CSV {csv_path} (state: {state}, diet: {diet_type}, meal: {meal_type}, invalid rows: {invalid_rows})")
-        return meals if meals else get_fallback_meal_data(state or "general")
+        return meals if meals or not use_fallback else get_fallback_meal_data(state or "general")
         
     except Exception as e:
         logger.error(f"Error loading meal data from CSV: {e}")
-        return get_fallback_meal_data(state or "general")
+        return get_fallback_meal_data(state or "general") if use_fallback else []
+
+def resolve_meal_category(meal: Dict[str, Any]) -> Optional[str]:
+    """Map a meal's Category/Meal value onto one of MEAL_CATEGORY_NAMES."""
+    meal_type = meal.get('Category', meal.get('Meal', '')).strip()
+    if meal_type in MEAL_CATEGORY_NAMES:
+        return meal_type
+    
+    meal_type_lower = meal_type.lower()
+    if 'breakfast' in meal_type_lower:
+        return 'Breakfast'
+    elif 'lunch' in meal_type_lower:
+        return 'Lunch'
+    elif 'dinner' in meal_type_lower:
+        return 'Dinner'
+    elif 'snack' in meal_type_lower:
+        return 'Morning Snack' if 'morning' in meal_type_lower else 'Evening Snack'
+    return None
+
+def categorize_meals(meals, per_category: Optional[int] = None) -> Dict[str, Tuple[Dict[str, Any], ...]]:
+    """
+    Group meals by category for full day plan selection.
+    
+    With per_category set, meals are visited in random order and each category keeps at most
+    that many candidates, stopping once every category is full.
+    """
+    meal_categories = {category: [] for category in MEAL_CATEGORY_NAMES}
+    if per_category is not None:
+        meals = random.sample(meals, len(meals))  # Shuffled copy - callers' meals may be shared
+        unfilled = len(MEAL_CATEGORY_NAMES)
+    
+    for meal in meals:
+        category = resolve_meal_category(meal)
+        if not category:
+            continue
+        category_meals = meal_categories[category]
+        if per_category is None:
+            category_meals.append(meal)
+        elif len(category_meals) < per_category:
+            category_meals.append(meal)
+            if len(category_meals) == per_category:
+                unfilled -= 1
+                if not unfilled:
+                    break
+    return {category: tuple(category_meals) for category, category_meals in meal_categories.items()}
+
+def get_meal_cache_entry(state: str = None, diet_type: str = None, meal_type: str = None, max_meals: int = MAX_MEALS_PER_REQUEST):
+    """
+    Get (loaded_at, meals, categories) from the in-process cache, re-reading the CSV only when the entry is older than MEAL_CACHE_TTL.
+    Only successful CSV loads are cached; fallback meals are rebuilt on each call.
+    
+    Meals and their category index are shared across requests, so callers must treat them as read-only.
+    """
+    cache_key = (state, diet_type, meal_type, max_meals)
+    now = time.monotonic()
+    
+    cached = meal_data_cache.get(cache_key)
+    if cached and now - cached[0] < MEAL_CACHE_TTL:
+        return cached
+    
+    meals = tuple(load_meal_data_from_csv(state=state, diet_type=diet_type, meal_type=meal_type, max_meals=max_meals, use_fallback=False))
+    if not meals:
+        # Don't cache fallback meals - a temporary CSV problem shouldn't stick for MEAL_CACHE_TTL
+        meals = tuple(get_fallback_meal_data(state or "general"))
+        return (now, meals, categorize_meals(meals))
+    
+    entry = (now, meals, categorize_meals(meals))
+    meal_data_cache[cache_key] = entry
+    cleanup_cache(meal_data_cache)
+    return entry
+
+def get_meals_cached(state: str = None, diet_type: str = None, meal_type: str = None, max_meals: int = MAX_MEALS_PER_REQUEST) -> Tuple[Dict[str, Any], ...]:
+    """Get cached meal data for the given filters (read-only)."""
+    return get_meal_cache_entry(state, diet_type, meal_type, max_meals)[1]
+
+def get_meal_categories_cached(state: str = None, diet_type: str = None, meal_type: str = None, max_meals: int = MAX_MEALS_PER_REQUEST) -> Dict[str, Tuple[Dict[str, Any], ...]]:
+    """Get the cached category index for the given filters (read-only)."""
+    return get_meal_cache_entry(state, diet_type, meal_type, max_meals)[2]
 
 def validate_csv_row(row: Dict[str, str]) -> bool:
     """Validate CSV row data for security and data integrity."""
@@ -713,18 +1068,15 @@ def validate_csv_row(row: Dict[str, str]) -> bool:
             if not row.get(field) or not row[field].strip():
                 return False
         
-        # Security: Check for suspicious content
-        suspicious_patterns = [
-            r'<script', r'javascript:', r'data:', r'vbscript:', r'onload=',
-            r'<iframe', r'<object', r'<embed', r'<form', r'<input'
-        ]
-        
+        # Security: Check for suspicious content and string lengths in one pass
         for field, value in row.items():
             if isinstance(value, str):
-                for pattern in suspicious_patterns:
-                    if re.search(pattern, value, re.IGNORECASE):
-                        logger.warning(f"Suspicious content found in CSV: {pattern}")
-                        return False
+                match = SUSPICIOUS_CONTENT_PATTERN.search(value)
+                if match:
+                    logger.warning(f"Suspicious content found in CSV: {match.group(0)}")
+                    return False
+                if len(value) > 1000:  # Max length per field
+                    return False
         
         # Validate numeric fields if present
         calories_str = row.get('Calories (kcal)', '')
@@ -736,11 +1088,6 @@ def validate_csv_row(row: Dict[str, str]) -> bool:
             except (ValueError, TypeError):
                 return False
         
-        # Validate string lengths
-        for field, value in row.items():
-            if isinstance(value, str) and len(value) > 1000:  # Max length per field
-                return False
-        
         return True
         
     except Exception as e:
@@ -759,7 +1106,7 @@ def convert_csv_row_to_meal(row: Dict[str, str]) -> Optional[Dict[str, Any]]:
                 ing_clean = ing.strip()
                 if ing_clean:
                     # Remove common measurement units and quantities
-                    ing_clean = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg', '', ing_clean).strip()
+                    ing_clean = QUANTITY_PATTERN.sub('', ing_clean).strip()
                     if ing_clean:
                         ingredients.append(ing_clean)
         else:
@@ -1010,6 +1357,65 @@ def filter_meals_by_preferences(meals: List[Dict[str, Any]], diet_type: str, med
     
     return filtered_meals
 
+def filter_meals_cached(meals, diet_type: str, medical_condition: str) -> Tuple[Dict[str, Any], ...]:
+    """Memoized filter_meals_by_preferences for shared (cached) meal tuples; result is read-only."""
+    cache_key = (id(meals), diet_type, medical_condition)
+    entry = filtered_meals_cache.get(cache_key)
+    # Entry keeps a reference to its source so the id() can't be reused while cached
+    if entry is not None and entry[0] is meals:
+        return entry[1]
+    
+    filtered_meals = tuple(filter_meals_by_preferences(meals, diet_type, medical_condition))
+    filtered_meals_cache[cache_key] = (meals, filtered_meals)
+    cleanup_cache(filtered_meals_cache)
+    return filtered_meals
+
+def get_suggested_ingredients(user_data: Dict[str, Any]) -> Tuple[str, ...]:
+    """Get sorted grocery suggestions for the user's state, diet and medical condition (cached for SUGGESTION_CACHE_TTL)."""
+    user_diet = user_data.get('diet_type', user_data.get('diet', 'vegetarian')).lower()
+    user_state = user_data.get('state', 'maharashtra').lower()
+    medical_condition = user_data.get('medical')
+    
+    # Check cache first
+    cache_key = (user_state, user_diet, medical_condition)
+    now = time.monotonic()
+    cached = suggestion_cache.get(cache_key)
+    if cached and now - cached[0] < SUGGESTION_CACHE_TTL:
+        return cached[1]
+    
+    suggested_ingredients = ()
+    meals = get_meals_cached(state=user_state, diet_type=user_diet, max_meals=30)
+    if meals:
+        # Filter meals by medical conditions if any
+        if medical_condition:
+            filtered_meals = filter_meals_cached(meals, user_diet, medical_condition)
+        else:
+            filtered_meals = meals[:10]  # Take more meals for better ingredient variety
+        
+        if len(filtered_meals) < 10:
+            filtered_meals = meals[:10]
+        
+        suggested_ingredients = tuple(sorted(collect_ingredients(filtered_meals)))
+    
+    suggestion_cache[cache_key] = (now, suggested_ingredients)
+    cleanup_cache(suggestion_cache)
+    return suggested_ingredients
+
+def collect_ingredients(meals, ingredients: Optional[set] = None) -> set:
+    """Add cleaned ingredient names (quantities stripped) from meals to a set."""
+    if ingredients is None:
+        ingredients = set()
+    for meal in meals:
+        meal_ingredients = meal.get('Ingredients', []) if isinstance(meal, dict) else []
+        if isinstance(meal_ingredients, list):
+            for ingredient in meal_ingredients:
+                if ingredient and isinstance(ingredient, str):
+                    # Remove common measurement units and quantities
+                    clean_ingredient = QUANTITY_PERCENT_PATTERN.sub('', ingredient.strip()).strip()
+                    if len(clean_ingredient) > 1:
+                        ingredients.add(clean_ingredient)
+    return ingredients
+
 def generate_weekly_plan(meals: List[Dict[str, Any]], user_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Generate a 7-day meal plan."""
     if len(meals) < 7:
@@ -1039,23 +1445,11 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # Clear navigation stack for new session
     clear_navigation_stack(user_id)
     
-    # Check if user already has a profile
-    existing_profile = await get_user_profile(user_id)
+    # Check if user already has a profile (streak data for the welcome message comes with it)
+    existing_profile, streak_data = await get_profile_and_streak(user_id)
     if existing_profile:
         # User has profile, show main menu
-        keyboard = [
-            [InlineKeyboardButton("🍽️ Get Daily Meal Plan", callback_data="get_meal_plan")],
-            [InlineKeyboardButton("🥘 Suggest from Ingredients", callback_data="ingredient_meal")],
-            [InlineKeyboardButton("📝 Log Today's Meals", callback_data="log_meal")],
-            [InlineKeyboardButton("📅 Weekly Meal Plan", callback_data="week_plan")],
-            [InlineKeyboardButton("🛒 Grocery List", callback_data="grocery_list")],
-            [InlineKeyboardButton("👤 View Profile", callback_data="view_profile")],
-            [InlineKeyboardButton("🔄 Update Profile", callback_data="update_profile")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Get streak data for welcome message
-        streak_data = await get_user_streak(user_id)
+        reply_markup = MAIN_MENU_MARKUP
         
         # Add to navigation stack
         add_to_navigation_stack(user_id, "main_menu", {"profile": existing_profile})
@@ -1073,12 +1467,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     # Initialize user data for new user
     user_data_cache[user_id] = {}
-    cleanup_cache(user_data_cache)
+    user_profile_fetched_at.pop(user_id, None)
+    cleanup_profile_cache()
     
-    keyboard = [
-        [InlineKeyboardButton("✅ Start Profile Creation", callback_data="start_profile")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = START_PROFILE_MARKUP
     
     await update.message.reply_text(
         "🍎 Hey there! Welcome to Nutrio - your personal nutrition wingman! 👋\n\n"
@@ -1115,13 +1507,19 @@ async def handle_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         await update.message.reply_text("❌ Please enter a valid name (2-50 characters, letters, numbers, spaces, dots, hyphens, apostrophes only)! 😅")
         return NAME
     
-    # Get existing user data or create new
-    user_data = user_data_cache.get(user_id, {})
+    # Get existing user data or create new; edit a copy so a profile refresh can't swap it out
+    user_data = dict(user_data_cache.get(user_id, {}))
     user_data["name"] = name
     
+    # The profile is a draft until saved - stop any in-flight refresh from overwriting it
+    refresh_task = profile_refresh_tasks.pop(user_id, None)
+    if refresh_task:
+        refresh_task.cancel()
+    user_profile_fetched_at.pop(user_id, None)
+    
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     await update.message.reply_text(
         f"✅ Got it! {name} it is! ✨\n\n"
@@ -1153,13 +1551,9 @@ async def handle_age(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
-    keyboard = [
-        [InlineKeyboardButton("👨 Male", callback_data="gender_male")],
-        [InlineKeyboardButton("👩 Female", callback_data="gender_female")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = GENDER_MARKUP
     
     await update.message.reply_text(
         f"✅ Sweet! {age} years old! 🎉\n\n"
@@ -1200,7 +1594,7 @@ async def handle_custom_medical(update: Update, context: ContextTypes.DEFAULT_TY
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     keyboard = [
         [InlineKeyboardButton("🛋️ Sedentary (Office work, minimal exercise)", callback_data="activity_sedentary")],
@@ -1232,7 +1626,7 @@ async def gender_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     keyboard = [
         [InlineKeyboardButton("🏛️ Maharashtra", callback_data="state_maharashtra")],
@@ -1265,7 +1659,7 @@ async def state_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     keyboard = [
         [InlineKeyboardButton("🥬 Vegetarian", callback_data="diet_veg")],
@@ -1302,7 +1696,7 @@ async def diet_selection(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     keyboard = [
         [InlineKeyboardButton("🩸 Diabetes", callback_data="medical_diabetes")],
@@ -1346,7 +1740,7 @@ async def medical_selection(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     keyboard = [
         [InlineKeyboardButton("🛋️ Sedentary (Office work, minimal exercise)", callback_data="activity_sedentary")],
@@ -1378,10 +1772,11 @@ async def activity_selection(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # Save to cache immediately
     user_data_cache[user_id] = user_data
-    cleanup_cache(user_data_cache)
+    cleanup_profile_cache()
     
     # Save profile to Firebase
     profile_saved = await save_user_profile(user_id, user_data)
+    context.user_data["profile"] = user_data
     
     # Update streak for completing Quick-Comm
     streak_data = await update_user_streak(user_id)
@@ -1428,17 +1823,9 @@ async def handle_ingredient_meal(update: Update, context: ContextTypes.DEFAULT_T
     logger.info(f"🔧 Ingredient meal requested by user {user_id}")
     
     # Get user profile
-    user_data = user_data_cache.get(user_id)
+    user_data = await get_user_profile(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
+        return await send_no_profile(query)
     
     # Store user data in context for later use
     context.user_data['ingredient_user_data'] = user_data
@@ -1486,9 +1873,7 @@ async def handle_meal_type_selection(update: Update, context: ContextTypes.DEFAU
         f"Please list your available ingredients (separated by commas):\n\n"
         f"Example: rice, dal, tomatoes, onions, potatoes, eggs, milk\n\n"
         f"I'll create a healthy {meal_type} using only these ingredients!",
-        reply_markup=InlineKeyboardMarkup([[
-            InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")
-        ]])
+        reply_markup=GO_BACK_MARKUP
     )
     
     logger.info(f"✅ Ingredient prompt sent to user {user_id}, returning INGREDIENTS state")
@@ -1506,17 +1891,13 @@ async def handle_ingredients_input(update: Update, context: ContextTypes.DEFAULT
     
     if not user_data:
         # Fallback to cache if not in context
-        user_data = user_data_cache.get(user_id)
+        user_data = await get_user_profile(user_id)
         if not user_data:
-            user_data = await get_user_profile(user_id)
-            if not user_data:
-                await update.message.reply_text(
-                    "❌ No profile found. Please create your profile first.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                    ]])
-                )
-                return ConversationHandler.END
+            await update.message.reply_text(
+                NO_PROFILE_TEXT,
+                reply_markup=START_OVER_MARKUP
+            )
+            return ConversationHandler.END
     
     # Show loading message
     loading_message = await update.message.reply_text(
@@ -1526,9 +1907,6 @@ async def handle_ingredients_input(update: Update, context: ContextTypes.DEFAULT
         )
 
     try:
-        # Import the ingredient-based meal generation function
-        from ai_meal_generator import generate_ingredient_based_meal_plan
-
         # Generate ingredient-based meal plan with specific meal type (BEAST MODE)
         ai_meal_plan = await generate_ingredient_based_meal_plan(user_data, ingredients, user_id, db, meal_type)
         
@@ -1598,17 +1976,9 @@ async def get_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         return MEAL_PLAN
     
     # Get user profile (from cache or Firebase)
-    user_data = user_data_cache.get(user_id)
+    user_data = await get_user_profile(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
+        return await send_no_profile(query)
     
     # Store user data in context for later use
     context.user_data['meal_plan_user_data'] = user_data
@@ -1617,15 +1987,7 @@ async def get_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     add_to_navigation_stack(user_id, "meal_plan_selection", {"user_data": user_data})
     
     # Simplified meal plan options
-    keyboard = [
-        [InlineKeyboardButton("🍽️ Daily Meal Plan", callback_data="quick_meal_plan")],
-        [InlineKeyboardButton("🌅 Breakfast", callback_data="meal_plan_type_breakfast")],
-        [InlineKeyboardButton("☀️ Lunch", callback_data="meal_plan_type_lunch")],
-        [InlineKeyboardButton("🌙 Dinner", callback_data="meal_plan_type_dinner")],
-        [InlineKeyboardButton("🍎 Snack", callback_data="meal_plan_type_snack")],
-        [InlineKeyboardButton("⬅️ Back", callback_data="navigate_back")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = MEAL_PLAN_OPTIONS_MARKUP
     
     await query.edit_message_text(
         f"🍽️ **Choose Your Meal Plan**\n\n"
@@ -1642,6 +2004,29 @@ async def get_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     
     return MEAL_PLAN
 
+# Action rows shared by every meal plan screen; only the rating row varies
+MEAL_PLAN_STATIC_ROWS = (
+    (InlineKeyboardButton("📝 Log Today's Meals", callback_data="log_meal"),),
+    (
+        InlineKeyboardButton("🛒 Grocery List", callback_data="grocery_list"),
+        InlineKeyboardButton("🚚 Order on Zepto", callback_data="order_zepto")
+    ),
+    (
+        InlineKeyboardButton("🔄 New Plan", callback_data="get_meal_plan"),
+        InlineKeyboardButton("⬅️ Back", callback_data="navigate_back")
+    )
+)
+
+def build_meal_plan_markup(rating_tag: str) -> InlineKeyboardMarkup:
+    """Build the meal plan action keyboard with Like/Dislike for rating_tag."""
+    return InlineKeyboardMarkup((
+        (
+            InlineKeyboardButton("👍 Like", callback_data=f"rate_like_{rating_tag}"),
+            InlineKeyboardButton("👎 Dislike", callback_data=f"rate_dislike_{rating_tag}")
+        ),
+        *MEAL_PLAN_STATIC_ROWS
+    ))
+
 async def quick_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Generate a quick daily meal plan instantly - SIMPLIFIED."""
     query = update.callback_query
@@ -1649,22 +2034,12 @@ async def quick_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     
     user_id = query.from_user.id
     
-    # Get user data from context
-    user_data = context.user_data.get('meal_plan_user_data')
+    # Get user data from context, falling back to cache or Firebase
+    user_data = context.user_data.get('meal_plan_user_data') or await get_user_profile(user_id)
     if not user_data:
-        user_data = user_data_cache.get(user_id)
-        if not user_data:
-            user_data = await get_user_profile(user_id)
-            if not user_data:
-                await query.edit_message_text(
-                    "❌ No profile found. Please create your profile first.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                    ]])
-                )
-                return ConversationHandler.END
-    
-    # Update streak
+        return await send_no_profile(query)
+    
+    # Update streak only once we know there's a profile; its document is cached by now
     streak_data = await update_user_streak(user_id)
     
     # Show loading message
@@ -1680,66 +2055,41 @@ async def quick_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         user_state = user_data.get('state', 'maharashtra').lower()
         
         # Normalize diet type for CSV matching
-        diet_mapping = {
-            'veg': 'Vegetarian',
-            'vegetarian': 'Vegetarian',
-            'non-veg': 'Non-Vegetarian',
-            'non-vegetarian': 'Non-Vegetarian',
-            'vegan': 'Vegan',
-            'jain': 'Jain',
-            'eggitarian': 'Eggitarian',
-            'keto': 'Keto',
-            'mixed': 'Mixed'
-        }
-        csv_diet_type = diet_mapping.get(user_diet, 'Vegetarian')
+        csv_diet_type = DIET_MAPPING.get(user_diet, 'Vegetarian')
         
         logger.info(f"🔍 Diet mapping: user_diet='{user_diet}' -> csv_diet_type='{csv_diet_type}'")
         
         # Load meals from CSV
-        meals = load_meal_data_from_csv(state=user_state, diet_type=csv_diet_type, max_meals=50)
+        meals = get_meals_cached(state=user_state, diet_type=csv_diet_type, max_meals=50)
+        meal_categories = get_meal_categories_cached(state=user_state, diet_type=csv_diet_type, max_meals=50)
         
         # Apply medical filtering
         medical_condition = user_data.get('medical', 'None')
         if medical_condition and medical_condition.lower() != 'none':
-            meals = filter_meals_by_preferences(meals, user_diet, medical_condition)
+            meals = filter_meals_cached(meals, user_diet, medical_condition)
+            meal_categories = None  # Filtered meals need their own categorization
         
         if not meals:
             await query.edit_message_text(
-                f"❌ No meal data available for {user_data['diet'].title()} diet in {user_data['state'].title()}.\n\n"
+                f"❌ No meal data available for {user_data.get('diet', '').title()} diet in {user_data.get('state', '').title()}.\n\n"
                 "Please try again later.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔄 Try Again", callback_data="get_meal_plan")
-                ]])
+                reply_markup=TRY_AGAIN_MARKUP
             )
             return ConversationHandler.END
         
         # Generate full day meal plan
-        meal_plan = generate_full_day_meal_plan(meals, user_data, streak_data, 0)
+        meal_plan = generate_full_day_meal_plan(meals, user_data, streak_data, 0, meal_categories)
         
         # Add to navigation stack
         add_to_navigation_stack(user_id, "daily_meal_plan", {"meal_plan": meal_plan})
         
         # Create action buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("👍 Like", callback_data="rate_like_quick_plan"),
-                InlineKeyboardButton("👎 Dislike", callback_data="rate_dislike_quick_plan")
-            ],
-            [InlineKeyboardButton("📝 Log Today's Meals", callback_data="log_meal")],
-            [
-                InlineKeyboardButton("🛒 Grocery List", callback_data="grocery_list"),
-                InlineKeyboardButton("🚚 Order on Zepto", callback_data="order_zepto")
-            ],
-            [
-                InlineKeyboardButton("🔄 New Plan", callback_data="get_meal_plan"),
-                InlineKeyboardButton("⬅️ Back", callback_data="navigate_back")
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = build_meal_plan_markup("quick_plan")
         
         # Cache the suggested meals for logging
         meal_names = [{'name': "Daily Meal Plan"}]
         context.user_data["last_suggested_meals"] = meal_names
+        context.user_data["normalized_meal_names"] = normalize_meal_names(meal_names)
         
         await query.edit_message_text(
             meal_plan,
@@ -1754,9 +2104,7 @@ async def quick_meal_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await query.edit_message_text(
             "❌ Error generating meal plan\n\n"
             "Something went wrong. Please try again later.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔄 Try Again", callback_data="get_meal_plan")
-            ]])
+            reply_markup=TRY_AGAIN_MARKUP
         )
         return ConversationHandler.END
 
@@ -1769,27 +2117,17 @@ async def generate_meal_plan_by_type(update: Update, context: ContextTypes.DEFAU
     
     user_id = query.from_user.id
     
-    # Get user data from context
-    user_data = context.user_data.get('meal_plan_user_data')
+    # Get user data from context, falling back to cache or Firebase
+    user_data = context.user_data.get('meal_plan_user_data') or await get_user_profile(user_id)
     if not user_data:
-        user_data = user_data_cache.get(user_id)
-        if not user_data:
-            user_data = await get_user_profile(user_id)
-            if not user_data:
-                await query.edit_message_text(
-                    "❌ No profile found. Please create your profile first.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                    ]])
-                )
-                return ConversationHandler.END
-    
-    # Get selected meal type
-    meal_type = query.data.replace("meal_plan_type_", "")
+        return await send_no_profile(query)
     
-    # Update streak
+    # Update streak only once we know there's a profile; its document is cached by now
     streak_data = await update_user_streak(user_id)
     
+    # Get selected meal type
+    meal_type = query.data.removeprefix("meal_plan_type_")
+    
     # Show loading message
     await query.edit_message_text(
         f"🍽️ Generating your {meal_type.replace('_', ' ').title()} meal plan...\n\n"
@@ -1803,38 +2141,26 @@ async def generate_meal_plan_by_type(update: Update, context: ContextTypes.DEFAU
         user_state = user_data.get('state', 'maharashtra').lower()
         
         # Normalize diet type for CSV matching
-        diet_mapping = {
-            'veg': 'Vegetarian',
-            'vegetarian': 'Vegetarian',
-            'non-veg': 'Non-Vegetarian',
-            'non-vegetarian': 'Non-Vegetarian',
-            'vegan': 'Vegan',
-            'jain': 'Jain',
-            'eggitarian': 'Eggitarian',
-            'keto': 'Keto',
-            'mixed': 'Mixed'
-        }
-        csv_diet_type = diet_mapping.get(user_diet, 'Vegetarian')
+        csv_diet_type = DIET_MAPPING.get(user_diet, 'Vegetarian')
         
         logger.info(f"🔍 Diet mapping: user_diet='{user_diet}' -> csv_diet_type='{csv_diet_type}'")
         
-        # Clear meal cache to ensure fresh data
-        meal_data_cache.clear()
-        
         # Load meals from CSV with debug logging
         logger.info(f"🔍 Loading meals for state: {user_state}, diet: {csv_diet_type}, meal_type: {meal_type}")
         
+        meal_categories = None
         if meal_type == "full_day":
-            meals = load_meal_data_from_csv(state=user_state, diet_type=csv_diet_type, max_meals=50)
+            meals = get_meals_cached(state=user_state, diet_type=csv_diet_type, max_meals=50)
+            meal_categories = get_meal_categories_cached(state=user_state, diet_type=csv_diet_type, max_meals=50)
         else:
-            meals = load_meal_data_from_csv(state=user_state, diet_type=csv_diet_type, meal_type=meal_type, max_meals=20)
+            meals = get_meals_cached(state=user_state, diet_type=csv_diet_type, meal_type=meal_type, max_meals=20)
         
         logger.info(f"📊 Loaded {len(meals) if meals else 0} meals from CSV")
         
         if not meals:
             logger.warning(f"⚠️ No meals loaded for state: {user_state}, diet: {csv_diet_type}, meal_type: {meal_type}")
             # Try loading without meal type filter to see if any meals exist
-            all_meals = load_meal_data_from_csv(state=user_state, diet_type=csv_diet_type, max_meals=10)
+            all_meals = get_meals_cached(state=user_state, diet_type=csv_diet_type, max_meals=10)
             logger.warning(f"🔍 Total meals without meal filter: {len(all_meals) if all_meals else 0}")
             if all_meals:
                 logger.warning(f"🔍 Sample meals without filter: {[m.get('Food Item', 'Unknown') for m in all_meals[:3]]}")
@@ -1851,22 +2177,21 @@ async def generate_meal_plan_by_type(update: Update, context: ContextTypes.DEFAU
         # Apply medical filtering
         medical_condition = user_data.get('medical', 'None')
         if medical_condition and medical_condition.lower() != 'none':
-            meals = filter_meals_by_preferences(meals, user_diet, medical_condition)
+            meals = filter_meals_cached(meals, user_diet, medical_condition)
+            meal_categories = None  # Filtered meals need their own categorization
         
         if not meals:
             await query.edit_message_text(
-                f"❌ No meal data available for {user_data['diet'].title()} diet in {user_data['state'].title()}.\n\n"
+                f"❌ No meal data available for {user_data.get('diet', '').title()} diet in {user_data.get('state', '').title()}.\n\n"
                 "Please try again later.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🔄 Try Again", callback_data="get_meal_plan")
-                ]])
+                reply_markup=TRY_AGAIN_MARKUP
             )
             return ConversationHandler.END
         
         # Generate meal plan and get selected meal
         selected_meal = None
         if meal_type == "full_day":
-            meal_plan = generate_full_day_meal_plan(meals, user_data, streak_data, 0)
+            meal_plan = generate_full_day_meal_plan(meals, user_data, streak_data, 0, meal_categories)
         else:
             # Select one meal for single meal type
             selected_meal = random.choice(meals) if meals else None
@@ -1879,22 +2204,7 @@ async def generate_meal_plan_by_type(update: Update, context: ContextTypes.DEFAU
         add_to_navigation_stack(user_id, f"{meal_type}_meal_plan", {"meal_plan": meal_plan, "meal_type": meal_type})
         
         # Create action buttons
-        keyboard = [
-            [
-                InlineKeyboardButton("👍 Like", callback_data=f"rate_like_{meal_type}_plan"),
-                InlineKeyboardButton("👎 Dislike", callback_data=f"rate_dislike_{meal_type}_plan")
-            ],
-            [InlineKeyboardButton("📝 Log Today's Meals", callback_data="log_meal")],
-            [
-                InlineKeyboardButton("🛒 Grocery List", callback_data="grocery_list"),
-                InlineKeyboardButton("🚚 Order on Zepto", callback_data="order_zepto")
-            ],
-            [
-                InlineKeyboardButton("🔄 New Plan", callback_data="get_meal_plan"),
-                InlineKeyboardButton("⬅️ Back", callback_data="navigate_back")
-            ]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = build_meal_plan_markup(f"{meal_type}_plan")
         
         # Cache the suggested meals for logging and grocery list
         if meal_type == "full_day":
@@ -1903,6 +2213,7 @@ async def generate_meal_plan_by_type(update: Update, context: ContextTypes.DEFAU
             # Cache the actual selected meal for grocery list generation
             meal_names = [selected_meal] if selected_meal else [{'name': f"{meal_type.replace('_', ' ').title()} Plan"}]
         context.user_data["last_suggested_meals"] = meal_names
+        context.user_data["normalized_meal_names"] = normalize_meal_names(meal_names)
         
         await query.edit_message_text(
             meal_plan,
@@ -1917,112 +2228,83 @@ async def generate_meal_plan_by_type(update: Update, context: ContextTypes.DEFAU
         await query.edit_message_text(
             "❌ Error generating meal plan\n\n"
             "Something went wrong. Please try again later.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🔄 Try Again", callback_data="get_meal_plan")
-            ]])
+            reply_markup=TRY_AGAIN_MARKUP
         )
         return ConversationHandler.END
 
-def generate_full_day_meal_plan(meals, user_data, streak_data, points_earned):
-    """Generate a full day meal plan."""
+def generate_full_day_meal_plan(meals, user_data, streak_data, points_earned, meal_categories=None):
+    """Generate a full day meal plan, reusing a precomputed category index when one is given."""
     # Filter meals by meal type to ensure we get one of each
-    meal_categories = {
-        'Breakfast': [],
-        'Lunch': [],
-        'Dinner': [],
-        'Evening Snack': [],
-        'Morning Snack': []
-    }
-    
-    # Categorize meals by their meal type
-    for meal in meals:
-        meal_type = meal.get('Category', meal.get('Meal', '')).strip()
-        if meal_type in meal_categories:
-            meal_categories[meal_type].append(meal)
-        elif 'breakfast' in meal_type.lower():
-            meal_categories['Breakfast'].append(meal)
-        elif 'lunch' in meal_type.lower():
-            meal_categories['Lunch'].append(meal)
-        elif 'dinner' in meal_type.lower():
-            meal_categories['Dinner'].append(meal)
-        elif 'snack' in meal_type.lower():
-            if 'morning' in meal_type.lower():
-                meal_categories['Morning Snack'].append(meal)
-            else:
-                meal_categories['Evening Snack'].append(meal)
+    if meal_categories is None:
+        meal_categories = categorize_meals(meals, MEAL_CATEGORY_CANDIDATES)
     
     # Select one meal from each category
     selected_meals = []
-    meal_types_order = ['Breakfast', 'Lunch', 'Dinner', 'Evening Snack']
+    selected_ids = set()  # id() of selected meals for O(1) "already picked" checks
     
-    for meal_type in meal_types_order:
+    for meal_type in MEAL_TYPES_ORDER:
         available_meals = meal_categories.get(meal_type, [])
         if available_meals:
             # Randomly select one meal from this category
-            selected_meal = random.choice(available_meals)
-            selected_meals.append(selected_meal)
-        else:
+            selected_meal = available_meals[random.randrange(len(available_meals))]
+        elif meal_type == 'Evening Snack' and meal_categories.get('Morning Snack'):
             # If no meals in this category, try to find a similar one
-            if meal_type == 'Evening Snack' and meal_categories.get('Morning Snack'):
-                selected_meal = random.choice(meal_categories['Morning Snack'])
-                selected_meals.append(selected_meal)
-            elif len(meals) > len(selected_meals):
-                # Fallback: pick any remaining meal
-                remaining_meals = [m for m in meals if m not in selected_meals]
-                if remaining_meals:
-                    selected_meals.append(random.choice(remaining_meals))
+            morning_snacks = meal_categories['Morning Snack']
+            selected_meal = morning_snacks[random.randrange(len(morning_snacks))]
+        else:
+            # Fallback: pick any remaining meal
+            remaining_meals = [m for m in meals if id(m) not in selected_ids]
+            selected_meal = random.choice(remaining_meals) if remaining_meals else None
+        
+        if selected_meal is not None:
+            selected_meals.append(selected_meal)
+            selected_ids.add(id(selected_meal))
     
     # If we still don't have 4 meals, add more from any category
-    while len(selected_meals) < 4 and len(meals) > len(selected_meals):
-        remaining_meals = [m for m in meals if m not in selected_meals]
-        if remaining_meals:
-            selected_meals.append(random.choice(remaining_meals))
-        else:
-            break
+    if len(selected_meals) < 4:
+        remaining_meals = [m for m in meals if id(m) not in selected_ids]
+        selected_meals.extend(random.sample(remaining_meals, min(4 - len(selected_meals), len(remaining_meals))))
     
     # Calculate total calories
     total_calories = sum(meal.get('approx_calories', 200) for meal in selected_meals)
     
-    # Format meal plan message
-    meal_message = f"🍽️ **Full Day Meal Plan**\n\n"
-    meal_message += f"👤 **Profile:** {user_data.get('name', 'Your')}\n"
-    meal_message += f"📍 **Region:** {user_data['state'].title()}\n"
-    meal_message += f"🥗 **Diet:** {user_data['diet'].title()}\n"
-    meal_message += f"🏥 **Medical:** {user_data['medical'].title()}\n"
-    meal_message += f"🏃 **Activity:** {user_data['activity'].title()}\n"
-    meal_message += f"🔥 **Streak:** {streak_data['streak_count']} days | Points: {streak_data['streak_points_total']}"
+    # Format meal plan message (collect parts, join once)
+    parts = [
+        f"🍽️ **Full Day Meal Plan**\n\n",
+        f"👤 **Profile:** {user_data.get('name', 'Your')}\n",
+        f"📍 **Region:** {user_data.get('state', '').title()}\n",
+        f"🥗 **Diet:** {user_data.get('diet', '').title()}\n",
+        f"🏥 **Medical:** {user_data.get('medical', '').title()}\n",
+        f"🏃 **Activity:** {user_data.get('activity', '').title()}\n",
+        f"🔥 **Streak:** {streak_data['streak_count']} days | Points: {streak_data['streak_points_total']}"
+    ]
     if points_earned > 0:
-        meal_message += f" (+{points_earned} today)"
-    meal_message += "\n\n"
-    meal_message += "─" * 40 + "\n\n"
-    
-    meal_types = ["Breakfast", "Lunch", "Dinner", "Snack"]
+        parts.append(f" (+{points_earned} today)")
+    parts.append("\n\n" + "─" * 40 + "\n\n")
     
     for i, meal in enumerate(selected_meals):
-        meal_type = meal_types[i] if i < len(meal_types) else "Meal"
+        meal_type = MEAL_TYPES_DISPLAY[i] if i < len(MEAL_TYPES_DISPLAY) else "Meal"
         meal_name = meal.get('Food Item', meal.get('Dish Combo', 'Unknown'))
         calories = meal.get('approx_calories', 200)
         health_impact = meal.get('Health Impact', '')
         ingredients = meal.get('Ingredients', [])
         calorie_level = meal.get('Calorie Level', '')
         
-        meal_message += f"**{meal_type}**\n"
-        meal_message += f"🍽️ {meal_name}\n"
-        meal_message += f"🔥 Calories: {calories}\n"
+        parts.append(f"**{meal_type}**\n🍽️ {meal_name}\n🔥 Calories: {calories}\n")
         if calorie_level:
-            meal_message += f"📊 Level: {calorie_level.title()}\n"
+            parts.append(f"📊 Level: {calorie_level.title()}\n")
         if ingredients:
             ingredients_text = ", ".join(ingredients)
-            meal_message += f"🥘 Ingredients: {ingredients_text}\n"
+            parts.append(f"🥘 Ingredients: {ingredients_text}\n")
         if health_impact:
-            meal_message += f"💚 Health: {health_impact}\n"
-        meal_message += "\n"
+            parts.append(f"💚 Health: {health_impact}\n")
+        parts.append("\n")
     
-    meal_message += "─" * 40 + "\n"
-    meal_message += f"🔥 **Total Calories:** {total_calories}\n\n"
-    meal_message += "✨ Meals personalized for your health needs"
+    parts.append("─" * 40 + "\n")
+    parts.append(f"🔥 **Total Calories:** {total_calories}\n\n")
+    parts.append("✨ Meals personalized for your health needs")
     
-    return meal_message
+    return "".join(parts)
 
 def generate_single_meal_plan(meals, user_data, meal_type, streak_data, points_earned):
     """Generate a single meal type plan with complete meal combo."""
@@ -2034,17 +2316,18 @@ def generate_single_meal_plan(meals, user_data, meal_type, streak_data, points_e
     
     # Format meal plan message
     meal_type_display = meal_type.replace('_', ' ').title()
-    meal_message = f"🍽️ **{meal_type_display} Meal Plan**\n\n"
-    meal_message += f"👤 **Profile:** {user_data.get('name', 'Your')}\n"
-    meal_message += f"📍 **Region:** {user_data['state'].title()}\n"
-    meal_message += f"🥗 **Diet:** {user_data['diet'].title()}\n"
-    meal_message += f"🏥 **Medical:** {user_data['medical'].title()}\n"
-    meal_message += f"🏃 **Activity:** {user_data['activity'].title()}\n"
-    meal_message += f"🔥 **Streak:** {streak_data['streak_count']} days | Points: {streak_data['streak_points_total']}"
+    parts = [
+        f"🍽️ **{meal_type_display} Meal Plan**\n\n",
+        f"👤 **Profile:** {user_data.get('name', 'Your')}\n",
+        f"📍 **Region:** {user_data.get('state', '').title()}\n",
+        f"🥗 **Diet:** {user_data.get('diet', '').title()}\n",
+        f"🏥 **Medical:** {user_data.get('medical', '').title()}\n",
+        f"🏃 **Activity:** {user_data.get('activity', '').title()}\n",
+        f"🔥 **Streak:** {streak_data['streak_count']} days | Points: {streak_data['streak_points_total']}"
+    ]
     if points_earned > 0:
-        meal_message += f" (+{points_earned} today)"
-    meal_message += "\n\n"
-    meal_message += "─" * 40 + "\n\n"
+        parts.append(f" (+{points_earned} today)")
+    parts.append("\n\n" + "─" * 40 + "\n\n")
     
     # Get meal details
     meal_name = selected_meal.get('Food Item', selected_meal.get('Dish Combo', 'Complete Meal'))
@@ -2053,22 +2336,22 @@ def generate_single_meal_plan(meals, user_data, meal_type, streak_data, points_e
     ingredients = selected_meal.get('Ingredients', [])
     calorie_level = selected_meal.get('Calorie Level', '')
     
-    meal_message += f"**🍽️ Your {meal_type_display} Combo**\n\n"
-    meal_message += f"🍽️ **{meal_name}**\n"
-    meal_message += f"🔥 **Calories:** {calories}\n"
+    parts.append(f"**🍽️ Your {meal_type_display} Combo**\n\n")
+    parts.append(f"🍽️ **{meal_name}**\n")
+    parts.append(f"🔥 **Calories:** {calories}\n")
     if calorie_level:
-        meal_message += f"📊 **Level:** {calorie_level.title()}\n"
+        parts.append(f"📊 **Level:** {calorie_level.title()}\n")
     if ingredients:
         ingredients_text = ", ".join(ingredients)
-        meal_message += f"🥘 **Ingredients:** {ingredients_text}\n"
+        parts.append(f"🥘 **Ingredients:** {ingredients_text}\n")
     if health_impact:
-        meal_message += f"💚 **Health Impact:** {health_impact}\n"
+        parts.append(f"💚 **Health Impact:** {health_impact}\n")
     
-    meal_message += "\n" + "─" * 40 + "\n"
-    meal_message += f"✨ **Complete {meal_type_display} combo** personalized for your health needs\n"
-    meal_message += f"🎯 **Perfect for:** {meal_type_display} time with balanced nutrition"
+    parts.append("\n" + "─" * 40 + "\n")
+    parts.append(f"✨ **Complete {meal_type_display} combo** personalized for your health needs\n")
+    parts.append(f"🎯 **Perfect for:** {meal_type_display} time with balanced nutrition")
     
-    return meal_message
+    return "".join(parts)
 
 async def handle_weekly_plan(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle weekly meal plan request."""
@@ -2078,34 +2361,24 @@ async def handle_weekly_plan(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = query.from_user.id
     
     # Get user profile
-    user_data = user_data_cache.get(user_id)
+    user_data = await get_user_profile(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
+        return await send_no_profile(query)
     
     # Load and filter meals from CSV based on user's state
     user_diet = user_data.get('diet_type', user_data.get('diet', 'vegetarian')).lower()
     user_state = user_data.get('state', 'maharashtra').lower()
-    meals = load_meal_data_from_csv(state=user_state, diet_type=user_diet, max_meals=50)
+    meals = get_meals_cached(state=user_state, diet_type=user_diet, max_meals=50)
     if not meals:
         await query.edit_message_text(
-            f"❌ No meal data available for {user_data['diet'].title()} diet in {user_data['state'].title()}.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-            ]])
+            f"❌ No meal data available for {user_data.get('diet', '').title()} diet in {user_data.get('state', '').title()}.",
+            reply_markup=START_OVER_MARKUP
         )
         return ConversationHandler.END
     
     # Filter meals based on preferences
     if user_data.get('medical'):
-        filtered_meals = filter_meals_by_preferences(meals, user_diet, user_data['medical'])
+        filtered_meals = filter_meals_cached(meals, user_diet, user_data['medical'])
     else:
         filtered_meals = meals[:20]  # Take first 20 meals if no medical conditions
     
@@ -2130,16 +2403,15 @@ async def show_weekly_day(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     if not weekly_plan or current_day >= len(weekly_plan):
         await query.edit_message_text(
             "❌ Weekly plan not available.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-            ]])
+            reply_markup=START_OVER_MARKUP
         )
         return ConversationHandler.END
     
     day_data = weekly_plan[current_day]
     
     # Format day message
-    day_message = f"📅 **Week {current_day + 1} - Day {day_data['day']}**\n\n"
+    buf = io.StringIO()
+    buf.write(f"📅 **Week {current_day + 1} - Day {day_data['day']}**\n\n")
     
     meal_types = [
         ("🌅 Breakfast", day_data.get('breakfast')),
@@ -2156,16 +2428,18 @@ async def show_weekly_day(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             ingredients = meal.get('Ingredients', [])
             calorie_level = meal.get('Calorie Level', '')
             
-            day_message += f"**{meal_type}:** {meal_name}\n"
-            day_message += f"🔥 Calories: ~{calories}\n"
+            buf.write(f"**{meal_type}:** {meal_name}\n")
+            buf.write(f"🔥 Calories: ~{calories}\n")
             if calorie_level:
-                day_message += f"📊 Calorie Level: {calorie_level.title()}\n"
+                buf.write(f"📊 Calorie Level: {calorie_level.title()}\n")
             if ingredients:
                 ingredients_text = ", ".join(ingredients)
-                day_message += f"🥘 Ingredients: {ingredients_text}\n"
+                buf.write(f"🥘 Ingredients: {ingredients_text}\n")
             if health_impact:
-                day_message += f"💡 Health Impact: {health_impact}\n"
-            day_message += "\n"
+                buf.write(f"💡 Health Impact: {health_impact}\n")
+            buf.write("\n")
+    
+    day_message = buf.getvalue()
     
     # Navigation buttons
     keyboard = []
@@ -2196,6 +2470,7 @@ async def handle_meal_rating(update: Update, context: ContextTypes.DEFAULT_TYPE)
     await query.answer()
     
     user_id = query.from_user.id
+    logger.info(f"🔧 Rating button clicked: {query.data}")
     rating_data = query.data.split("_")
     
     if len(rating_data) < 2:
@@ -2216,19 +2491,14 @@ async def handle_meal_rating(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Log the rating attempt
     logger.info(f"🔧 Rating attempt by user {user_id}: {rating_type} for meal '{meal_name}'")
     
-    # Save rating to Firebase
-    rating_saved = await save_meal_rating(user_id, meal_name, rating_value)
-    
-    # Log the result
-    logger.info(f"✅ Rating saved for user {user_id}: {rating_type} for '{meal_name}' - Firebase: {rating_saved}")
-    
-    # Show confirmation
+    # Build confirmation (status line is filled in per outcome)
     emoji = "👍" if rating_type == "like" else "👎"
-    message = f"{emoji} **Rating Saved!**\n\n"
-    message += f"**Meal:** {meal_name}\n"
-    message += f"**Rating:** {'Liked' if rating_type == 'like' else 'Disliked'}\n"
-    message += f"{'✅ Saved to database' if rating_saved else '⚠️ Saved locally only'}\n\n"
-    message += "Thanks for the feedback fam! This helps me get better at suggesting meals for you! 🙏"
+    message_head = (
+        f"{emoji} **Rating Saved!**\n\n"
+        f"**Meal:** {meal_name}\n"
+        f"**Rating:** {'Liked' if rating_type == 'like' else 'Disliked'}\n"
+    )
+    message_tail = "\n\nThanks for the feedback fam! This helps me get better at suggesting meals for you! 🙏"
     
     keyboard = [
         [InlineKeyboardButton("🍽️ Get New Meal Plan", callback_data="get_meal_plan")],
@@ -2237,12 +2507,27 @@ async def handle_meal_rating(update: Update, context: ContextTypes.DEFAULT_TYPE)
     ]
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    await query.edit_message_text(
-        message,
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
+    # Save rating to Firebase while optimistically showing the confirmation
+    rating_saved, _ = await asyncio.gather(
+        save_meal_rating(user_id, meal_name, rating_value),
+        query.edit_message_text(
+            message_head + "✅ Saved to database" + message_tail,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
     )
     
+    # Log the result
+    logger.info(f"✅ Rating saved for user {user_id}: {rating_type} for '{meal_name}' - Firebase: {rating_saved}")
+    
+    # Correct the confirmation if the write failed
+    if not rating_saved:
+        await query.edit_message_text(
+            message_head + "⚠️ Saved locally only" + message_tail,
+            reply_markup=reply_markup,
+            parse_mode='Markdown'
+        )
+    
     return MEAL_PLAN
 
 async def show_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
@@ -2252,35 +2537,38 @@ async def show_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     
+    # Persist any debounced list/cart edits when navigating to the list
+    await asyncio.gather(
+        flush_write(persist_grocery_list, user_id),
+        flush_write(persist_cart_selections, user_id)
+    )
+    
+    return await render_grocery_list(update, context)
+
+async def render_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Render the grocery list from cached list/cart data without flushing pending writes."""
+    query = update.callback_query
+    user_id = query.from_user.id
+    
     # Get user profile
-    user_data = user_data_cache.get(user_id)
+    user_data = await get_user_profile(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
+        return await send_no_profile(query)
     
     # Load meals from CSV based on user's state
     user_diet = user_data.get('diet_type', user_data.get('diet', 'vegetarian')).lower()
     user_state = user_data.get('state', 'maharashtra').lower()
-    meals = load_meal_data_from_csv(state=user_state, diet_type=user_diet, max_meals=30)
+    meals = get_meals_cached(state=user_state, diet_type=user_diet, max_meals=30)
     if not meals:
         await query.edit_message_text(
-            f"❌ No meal data available for {user_data['diet'].title()} diet in {user_data['state'].title()}.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-            ]])
+            f"❌ No meal data available for {user_data.get('diet', '').title()} diet in {user_data.get('state', '').title()}.",
+            reply_markup=START_OVER_MARKUP
         )
         return ConversationHandler.END
     
     # Filter meals based on preferences
     if user_data.get('medical'):
-        filtered_meals = filter_meals_by_preferences(meals, user_diet, user_data['medical'])
+        filtered_meals = filter_meals_cached(meals, user_diet, user_data['medical'])
     else:
         filtered_meals = meals[:10]  # Take first 10 meals if no medical conditions
     
@@ -2289,58 +2577,22 @@ async def show_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     # First try to get ingredients from last suggested meals (from meal plan)
     last_meals = context.user_data.get("last_suggested_meals", [])
-    all_ingredients = set()
-    
-    if last_meals:
-        # Extract ingredients from last suggested meals
-        for meal in last_meals:
-            if isinstance(meal, dict) and 'Ingredients' in meal:
-                ingredients = meal.get('Ingredients', [])
-                if isinstance(ingredients, list):
-                    for ingredient in ingredients:
-                        if ingredient and isinstance(ingredient, str) and len(ingredient.strip()) > 0:
-                            clean_ingredient = ingredient.strip()
-                            clean_ingredient = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%', '', clean_ingredient).strip()
-                            if clean_ingredient and len(clean_ingredient) > 1:
-                                all_ingredients.add(clean_ingredient)
+    all_ingredients = collect_ingredients(last_meals)
     
     # If no ingredients from last meals, use filtered meals from CSV
     if not all_ingredients:
-        for meal in filtered_meals[:8]:  # Take first 8 meals for more variety
-            ingredients = meal.get('Ingredients', [])
-            if isinstance(ingredients, list):
-                # Clean and validate each ingredient
-                for ingredient in ingredients:
-                    if ingredient and isinstance(ingredient, str) and len(ingredient.strip()) > 0:
-                        # Clean ingredient name
-                        clean_ingredient = ingredient.strip()
-                        # Remove common measurement units and quantities
-                        clean_ingredient = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%', '', clean_ingredient).strip()
-                        if clean_ingredient and len(clean_ingredient) > 1:
-                            all_ingredients.add(clean_ingredient)
-    
-    # Convert to list and sort
-    ingredients_list = sorted(list(all_ingredients))
-    
-    # If still no ingredients found, try to get from more meals
-    if len(ingredients_list) < 5:
-        for meal in filtered_meals[8:15]:  # Try more meals
-            ingredients = meal.get('Ingredients', [])
-            if isinstance(ingredients, list):
-                for ingredient in ingredients:
-                    if ingredient and isinstance(ingredient, str) and len(ingredient.strip()) > 0:
-                        clean_ingredient = ingredient.strip()
-                        clean_ingredient = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%', '', clean_ingredient).strip()
-                        if clean_ingredient and len(clean_ingredient) > 1:
-                            all_ingredients.add(clean_ingredient)
-        ingredients_list = sorted(list(all_ingredients))
+        collect_ingredients(filtered_meals[:8], all_ingredients)  # Take first 8 meals for more variety
+    
+    # If still few ingredients found, try to get from more meals
+    if len(all_ingredients) < 5:
+        collect_ingredients(filtered_meals[8:15], all_ingredients)
     
     # Get user's current grocery list from cache or Firebase
     user_grocery_list = await get_grocery_list(user_id)
     
-    # Combine suggested ingredients with user's custom list
-    combined_list = list(set(ingredients_list + user_grocery_list))
-    combined_list.sort()
+    # Combine suggested ingredients with user's custom list (one set, one sort)
+    all_ingredients.update(user_grocery_list)
+    combined_list = sorted(all_ingredients)
     
     # Get user's cart selections from cache or Firebase
     user_cart = await get_cart_selections(user_id)
@@ -2348,8 +2600,8 @@ async def show_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
     grocery_message = (
         f"🛒 **Your Shopping List**\n\n"
         f"👤 **For:** {user_data.get('name', 'Your')} profile\n"
-        f"🏛️ **Region:** {user_data['state'].title()}\n"
-        f"🥬 **Diet:** {user_data['diet'].title()}\n\n"
+        f"🏛️ **Region:** {user_data.get('state', '').title()}\n"
+        f"🥬 **Diet:** {user_data.get('diet', '').title()}\n\n"
         f"*Select items for your cart:*\n\n"
     )
     
@@ -2358,10 +2610,10 @@ async def show_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
     for ingredient in combined_list:
         if ingredient in user_cart:
             # Item is in cart - show "Added" button
-            keyboard.append([InlineKeyboardButton(f"✅ {ingredient}", callback_data=f"cart_toggle_{ingredient}")])
+            keyboard.append([InlineKeyboardButton(f"✅ {ingredient}", callback_data=f"cart_toggle:{ingredient}")])
         else:
             # Item is not in cart - show "Add to Cart" button
-            keyboard.append([InlineKeyboardButton(f"➕ Add {ingredient}", callback_data=f"cart_toggle_{ingredient}")])
+            keyboard.append([InlineKeyboardButton(f"➕ Add {ingredient}", callback_data=f"cart_toggle:{ingredient}")])
     
     # Add to navigation stack
     add_to_navigation_stack(user_id, "grocery_list", {"user_data": user_data})
@@ -2389,43 +2641,15 @@ async def manage_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     user_id = query.from_user.id
     
+    # Persist any debounced list edits before showing the list
+    await flush_write(persist_grocery_list, user_id)
+    
     # Get user's current grocery list from cache or Firebase
     user_grocery_list = await get_grocery_list(user_id)
     
     # Get suggested ingredients from meals
-    user_data = user_data_cache.get(user_id)
-    if not user_data:
-        user_data = await get_user_profile(user_id)
-    
-    suggested_ingredients = []
-    if user_data:
-        # Load meals based on user's diet type and state
-        user_diet = user_data.get('diet_type', user_data.get('diet', 'vegetarian')).lower()
-        user_state = user_data.get('state', 'maharashtra').lower()
-        meals = load_meal_data_from_csv(state=user_state, diet_type=user_diet, max_meals=30)
-        if meals:
-            # Filter meals by medical conditions if any
-            if user_data.get('medical'):
-                filtered_meals = filter_meals_by_preferences(meals, user_diet, user_data['medical'])
-            else:
-                filtered_meals = meals[:10]  # Take more meals for better ingredient variety
-            
-            if len(filtered_meals) < 10:
-                filtered_meals = meals[:10]
-            
-            all_ingredients = set()
-            for meal in filtered_meals:
-                ingredients = meal.get('Ingredients', [])
-                if isinstance(ingredients, list):
-                    for ingredient in ingredients:
-                        if ingredient and isinstance(ingredient, str) and len(ingredient.strip()) > 0:
-                            # Clean ingredient name
-                            clean_ingredient = ingredient.strip()
-                            # Remove common measurement units and quantities
-                            clean_ingredient = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%', '', clean_ingredient).strip()
-                            if clean_ingredient and len(clean_ingredient) > 1:
-                                all_ingredients.add(clean_ingredient)
-            suggested_ingredients = sorted(list(all_ingredients))
+    user_data = await get_user_profile(user_id)
+    suggested_ingredients = get_suggested_ingredients(user_data) if user_data else ()
     
     # Create management message
     manage_message = (
@@ -2463,43 +2687,13 @@ async def add_grocery_items(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = query.from_user.id
     
     # Get suggested ingredients
-    user_data = user_data_cache.get(user_id)
-    if not user_data:
-        user_data = await get_user_profile(user_id)
-    
-    suggested_ingredients = []
-    if user_data:
-        # Load meals based on user's diet type and state
-        user_diet = user_data.get('diet_type', user_data.get('diet', 'vegetarian')).lower()
-        user_state = user_data.get('state', 'maharashtra').lower()
-        meals = load_meal_data_from_csv(state=user_state, diet_type=user_diet, max_meals=30)
-        if meals:
-            # Filter meals by medical conditions if any
-            if user_data.get('medical'):
-                filtered_meals = filter_meals_by_preferences(meals, user_diet, user_data['medical'])
-            else:
-                filtered_meals = meals[:10]  # Take more meals for better ingredient variety
-            
-            if len(filtered_meals) < 10:
-                filtered_meals = meals[:10]
-            
-            all_ingredients = set()
-            for meal in filtered_meals:
-                ingredients = meal.get('Ingredients', [])
-                if isinstance(ingredients, list):
-                    for ingredient in ingredients:
-                        if ingredient and isinstance(ingredient, str) and len(ingredient.strip()) > 0:
-                            # Clean ingredient name
-                            clean_ingredient = ingredient.strip()
-                            # Remove common measurement units and quantities
-                            clean_ingredient = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%', '', clean_ingredient).strip()
-                            if clean_ingredient and len(clean_ingredient) > 1:
-                                all_ingredients.add(clean_ingredient)
-            suggested_ingredients = sorted(list(all_ingredients))
+    user_data = await get_user_profile(user_id)
+    suggested_ingredients = get_suggested_ingredients(user_data) if user_data else ()
     
     # Get user's current list to avoid duplicates
     user_grocery_list = await get_grocery_list(user_id)
-    available_items = [item for item in suggested_ingredients if item not in user_grocery_list]
+    existing_items = set(user_grocery_list)
+    available_items = [item for item in suggested_ingredients if item not in existing_items]
     
     # Create add message
     add_message = (
@@ -2508,13 +2702,11 @@ async def add_grocery_items(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
     
     # Create buttons for available items (max 10 per row)
-    keyboard = []
-    for i in range(0, len(available_items), 2):
-        row = []
-        row.append(InlineKeyboardButton(f"➕ {available_items[i]}", callback_data=f"add_item_{available_items[i]}"))
-        if i + 1 < len(available_items):
-            row.append(InlineKeyboardButton(f"➕ {available_items[i+1]}", callback_data=f"add_item_{available_items[i+1]}"))
-        keyboard.append(row)
+    items = iter(available_items)
+    keyboard = [
+        [InlineKeyboardButton(f"➕ {item}", callback_data=f"add_item:{item}") for item in pair if item is not None]
+        for pair in zip_longest(items, items)
+    ]
     
     # Add navigation buttons
     keyboard.extend([
@@ -2559,13 +2751,11 @@ async def remove_grocery_items(update: Update, context: ContextTypes.DEFAULT_TYP
     )
     
     # Create buttons for current items (max 2 per row)
-    keyboard = []
-    for i in range(0, len(user_grocery_list), 2):
-        row = []
-        row.append(InlineKeyboardButton(f"➖ {user_grocery_list[i]}", callback_data=f"remove_item_{user_grocery_list[i]}"))
-        if i + 1 < len(user_grocery_list):
-            row.append(InlineKeyboardButton(f"➖ {user_grocery_list[i+1]}", callback_data=f"remove_item_{user_grocery_list[i+1]}"))
-        keyboard.append(row)
+    items = iter(user_grocery_list)
+    keyboard = [
+        [InlineKeyboardButton(f"➖ {item}", callback_data=f"remove_item:{item}") for item in pair if item is not None]
+        for pair in zip_longest(items, items)
+    ]
     
     # Add navigation buttons
     keyboard.extend([
@@ -2590,18 +2780,19 @@ async def add_grocery_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await query.answer()
     
     user_id = query.from_user.id
-    item_name = query.data.split("_", 2)[2]  # Get item name from callback data
+    # Sanitize up front so the item compares the same way as the cached, sanitized list
+    item_name = sanitize_input(query.data.partition(":")[2], 100)  # Get item name from callback data
     
     # Get current grocery list
     user_grocery_list = await get_grocery_list(user_id)
     
-    # Add item if not already in list
-    if item_name not in user_grocery_list:
-        user_grocery_list.append(item_name)
-        user_grocery_list.sort()  # Keep list sorted
+    # Add item if not already in list (list is kept sorted, so binary search both checks and places it)
+    index = bisect.bisect_left(user_grocery_list, item_name)
+    if item_name and (index == len(user_grocery_list) or user_grocery_list[index] != item_name):
+        user_grocery_list.insert(index, item_name)
         
-        # Save updated list
-        await save_grocery_list(user_id, user_grocery_list)
+        # Save updated list (debounced)
+        schedule_grocery_list_save(user_id, user_grocery_list)
     
     # Show confirmation
     await query.edit_message_text(
@@ -2625,16 +2816,18 @@ async def remove_grocery_item(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
     
     user_id = query.from_user.id
-    item_name = query.data.split("_", 2)[2]  # Get item name from callback data
+    # Sanitize so the name matches the cached, sanitized list
+    item_name = sanitize_input(query.data.partition(":")[2], 100)  # Get item name from callback data
     
     # Get current grocery list
     user_grocery_list = await get_grocery_list(user_id)
     
-    # Remove item from list
-    if item_name in user_grocery_list:
-        user_grocery_list.remove(item_name)
-        # Save updated list
-        await save_grocery_list(user_id, user_grocery_list)
+    # Remove item from list (list is kept sorted, so binary search finds it)
+    index = bisect.bisect_left(user_grocery_list, item_name)
+    if index < len(user_grocery_list) and user_grocery_list[index] == item_name:
+        del user_grocery_list[index]
+        # Save updated list (debounced)
+        schedule_grocery_list_save(user_id, user_grocery_list)
     
     # Show confirmation
     await query.edit_message_text(
@@ -2660,7 +2853,7 @@ async def clear_grocery_list(update: Update, context: ContextTypes.DEFAULT_TYPE)
     user_id = query.from_user.id
     
     # Clear the list
-    await save_grocery_list(user_id, [])
+    schedule_grocery_list_save(user_id, [])
     
     await query.edit_message_text(
         f"🗑️ **List Cleared!**\n\n"
@@ -2683,7 +2876,7 @@ async def toggle_cart_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     await query.answer()
     
     user_id = query.from_user.id
-    item_name = query.data.split("_", 2)[2]  # Get item name from callback data
+    item_name = query.data.partition(":")[2]  # Get item name from callback data
     
     # Get current cart selections
     user_cart = await get_cart_selections(user_id)
@@ -2695,10 +2888,10 @@ async def toggle_cart_item(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         user_cart.add(item_name)
     
     # Save updated cart selections
-    await save_cart_selections(user_id, user_cart)
+    schedule_cart_selections_save(user_id, user_cart)
     
-    # Return to the grocery list to show updated state
-    return await show_grocery_list(update, context)
+    # Re-render the grocery list from cache; the debounced cart write stays pending
+    return await render_grocery_list(update, context)
 
 async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Show the user's cart with selected items."""
@@ -2708,17 +2901,9 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = query.from_user.id
     
     # Get user profile
-    user_data = user_data_cache.get(user_id)
+    user_data = await get_user_profile(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
+        return await send_no_profile(query)
     
     # Get user's cart selections from cache or Firebase
     user_cart = await get_cart_selections(user_id)
@@ -2731,12 +2916,7 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
             f"*Go back to the shopping list to add items to your cart!*"
         )
         
-        keyboard = [
-            [InlineKeyboardButton("👤 View Profile", callback_data="view_profile")],
-            [InlineKeyboardButton("🛒 Back to Shopping List", callback_data="grocery_list")],
-            [InlineKeyboardButton("⬅️ Back to Meal Plan", callback_data="get_meal_plan")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = EMPTY_CART_MARKUP
         
         await query.edit_message_text(
             cart_message,
@@ -2753,11 +2933,21 @@ async def show_cart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         f"*Selected items:*\n\n"
     )
     
-    for i, item in enumerate(sorted(user_cart), 1):
-        cart_message += f"{i}. {item}\n"
+    # Reuse the rendered item list while the cart contents are unchanged
+    cart_key = frozenset(user_cart)
+    cached_render = context.user_data.get("cart_render")
+    if cached_render and cached_render[0] == cart_key:
+        items_text = cached_render[1]
+    else:
+        items_text = "\n".join(f"{i}. {item}" for i, item in enumerate(sorted(user_cart), 1))
+        context.user_data["cart_render"] = (cart_key, items_text)
     
-    cart_message += f"\n*Total items: {len(user_cart)}*\n\n"
-    cart_message += "*Ready to order? Choose your delivery service below!*"
+    cart_message = "".join((
+        cart_message,
+        items_text,
+        f"\n\n*Total items: {len(user_cart)}*\n\n",
+        "*Ready to order? Choose your delivery service below!*"
+    ))
     
     # Add to navigation stack
     add_to_navigation_stack(user_id, "show_cart", {"user_data": user_data})
@@ -2787,17 +2977,9 @@ async def order_on_zepto(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_id = query.from_user.id
     
     # Get user profile
-    user_data = user_data_cache.get(user_id)
+    user_data = await get_user_profile(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
+        return await send_no_profile(query)
     
     # Get ingredients from last suggested meals (AI or JSON)
     last_meals = context.user_data.get("last_suggested_meals", [])
@@ -2813,56 +2995,34 @@ async def order_on_zepto(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
                     all_ingredients.update(ingredients)
                 elif isinstance(ingredients, str):
                     # Handle string ingredients
-                    all_ingredients.update([ing.strip() for ing in ingredients.split(',')])
+                    all_ingredients.update(map(str.strip, ingredients.split(',')))
             else:
                 # AI meal format - extract from meal name
-                meal_name = str(meal)
-                # Common ingredients that might be in meal names
-                common_ingredients = ["Rice", "Dal", "Vegetables", "Potato", "Tomato", "Onion", "Oil", "Spices"]
-                for ingredient in common_ingredients:
-                    if ingredient.lower() in meal_name.lower():
+                meal_name = str(meal).lower()
+                for keyword, ingredient in COMMON_INGREDIENT_KEYWORDS:
+                    if keyword in meal_name:
                         all_ingredients.add(ingredient)
     
-    # If no ingredients found, fallback to CSV meals
-    if not all_ingredients:
-        user_diet = user_data.get('diet_type', user_data.get('diet', 'vegetarian')).lower()
-        user_state = user_data.get('state', 'maharashtra').lower()
-        meals = load_meal_data_from_csv(state=user_state, diet_type=user_diet, max_meals=30)
-        if meals:
-            # Filter meals by medical conditions if any
-            if user_data.get('medical'):
-                filtered_meals = filter_meals_by_preferences(meals, user_diet, user_data['medical'])
-            else:
-                filtered_meals = meals[:10]
-            
-            if len(filtered_meals) < 10:
-                filtered_meals = meals[:10]
-            
-            for meal in filtered_meals:
-                ingredients = meal.get('Ingredients', [])
-                if isinstance(ingredients, list):
-                    for ingredient in ingredients:
-                        if ingredient and isinstance(ingredient, str) and len(ingredient.strip()) > 0:
-                            clean_ingredient = ingredient.strip()
-                            clean_ingredient = re.sub(r'\d+g|\d+ml|\d+kg|\d+mg|\d+%', '', clean_ingredient).strip()
-                            if clean_ingredient and len(clean_ingredient) > 1:
-                                all_ingredients.add(clean_ingredient)
-    
-    # Convert to list and sort
-    ingredients_list = sorted(list(all_ingredients))
+    if all_ingredients:
+        # Convert to list and sort
+        ingredients_list = sorted(all_ingredients)
+    else:
+        # If no ingredients found, fallback to CSV meal suggestions (already sorted)
+        ingredients_list = get_suggested_ingredients(user_data)
     
     # Silently add ingredients to grocery list
     if ingredients_list:
         current_grocery_list = await get_grocery_list(user_id)
-        new_items = [item for item in ingredients_list[:8] if item not in current_grocery_list]  # Limit to 8 items
+        existing_items = set(current_grocery_list)
+        new_items = [item for item in ingredients_list[:8] if item not in existing_items]  # Limit to 8 items
         if new_items:
-            updated_list = current_grocery_list + new_items
+            updated_list = sorted(current_grocery_list + new_items)  # Keep list sorted
             await save_grocery_list(user_id, updated_list)
             logger.info(f"✅ Silently added {len(new_items)} ingredients to grocery list for user {user_id}")
     
     # Create search query for Zepto
-    search_query = "+".join(ingredients_list[:5])  # Limit to first 5 items
-    zepto_url = f"https://www.zepto.com/search?q={search_query}"
+    # Limit to first 5 items; encode so spaces and '&' don't break the link
+    zepto_url = "https://www.zepto.com/search?" + urlencode({"q": " ".join(ingredients_list[:5])})
     
     zepto_message = (
         f"🚚 **Get Your Groceries Delivered!**\n\n"
@@ -2899,21 +3059,10 @@ async def show_user_profile(update: Update, context: ContextTypes.DEFAULT_TYPE)
     
     user_id = query.from_user.id
     
-    # Get user profile
-    user_data = user_data_cache.get(user_id)
+    # Get user profile and streak data
+    user_data, streak_data = await get_profile_and_streak(user_id)
     if not user_data:
-        user_data = await get_user_profile(user_id)
-        if not user_data:
-            await query.edit_message_text(
-                "❌ No profile found. Please create your profile first.",
-                reply_markup=InlineKeyboardMarkup([[
-                    InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                ]])
-            )
-            return ConversationHandler.END
-    
-    # Get streak data
-    streak_data = await get_user_streak(user_id)
+        return await send_no_profile(query)
     
     # Format profile message
     profile_message = (
@@ -2989,11 +3138,7 @@ async def show_streak_help(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         f"*Your streak resets at midnight if you miss a day*"
     )
     
-    keyboard = [
-        [InlineKeyboardButton("👤 Back to Profile", callback_data="view_profile")],
-        [InlineKeyboardButton("🍽️ Get Meal Plan", callback_data="get_meal_plan")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = STREAK_HELP_MARKUP
     
     await query.edit_message_text(
         help_message,
@@ -3030,15 +3175,7 @@ async def navigate_back(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         user_data = context_data.get('user_data')
         if user_data:
             context.user_data['meal_plan_user_data'] = user_data
-            keyboard = [
-                [InlineKeyboardButton("🍽️ Daily Meal Plan", callback_data="quick_meal_plan")],
-                [InlineKeyboardButton("🌅 Breakfast", callback_data="meal_plan_type_breakfast")],
-                [InlineKeyboardButton("☀️ Lunch", callback_data="meal_plan_type_lunch")],
-                [InlineKeyboardButton("🌙 Dinner", callback_data="meal_plan_type_dinner")],
-                [InlineKeyboardButton("🍎 Snack", callback_data="meal_plan_type_snack")],
-                [InlineKeyboardButton("⬅️ Back", callback_data="navigate_back")]
-            ]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = MEAL_PLAN_OPTIONS_MARKUP
             
             await query.edit_message_text(
                 f"🍽️ **Choose Your Meal Plan**\n\n"
@@ -3070,26 +3207,12 @@ async def go_back(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     # Clear navigation stack and add main menu
     clear_navigation_stack(user_id)
     
-    # Get user profile
-    user_data = user_data_cache.get(user_id)
-    if not user_data:
-        user_data = await get_user_profile(user_id)
+    # Get user profile and streak data for the welcome message
+    user_data, streak_data = await get_profile_and_streak(user_id)
     
     if user_data:
         # User has profile - show main menu
-        keyboard = [
-            [InlineKeyboardButton("🍽️ Get Daily Meal Plan", callback_data="get_meal_plan")],
-            [InlineKeyboardButton("🥘 Suggest from Ingredients", callback_data="ingredient_meal")],
-            [InlineKeyboardButton("📝 Log Today's Meals", callback_data="log_meal")],
-            [InlineKeyboardButton("📅 Weekly Meal Plan", callback_data="week_plan")],
-            [InlineKeyboardButton("🛒 Grocery List", callback_data="grocery_list")],
-            [InlineKeyboardButton("👤 View Profile", callback_data="view_profile")],
-            [InlineKeyboardButton("🔄 Update Profile", callback_data="update_profile")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Get streak data for welcome message
-        streak_data = await get_user_streak(user_id)
+        reply_markup = MAIN_MENU_MARKUP
         
         # Add main menu to navigation stack
         add_to_navigation_stack(user_id, "main_menu", {"profile": user_data})
@@ -3106,10 +3229,7 @@ async def go_back(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         return MEAL_PLAN
     else:
         # No profile - start profile creation
-        keyboard = [
-            [InlineKeyboardButton("✅ Start Profile Creation", callback_data="start_profile")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = START_PROFILE_MARKUP
         
         await query.edit_message_text(
             "🍎 Hey there! Welcome to Nutrio - your personal nutrition wingman! 👋\n\n"
@@ -3128,13 +3248,11 @@ async def start_over(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = query.from_user.id
     if user_id in user_data_cache:
         del user_data_cache[user_id]
+    user_profile_fetched_at.pop(user_id, None)
+    context.user_data.pop("profile", None)
     
     # Restart the conversation
-    keyboard = [
-        [InlineKeyboardButton("👨 Male", callback_data="gender_male")],
-        [InlineKeyboardButton("👩 Female", callback_data="gender_female")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = GENDER_MARKUP
     
     await query.edit_message_text(
         "🍎 Hey! Welcome to Nutrio - your nutrition wingman! 👋\n\n"
@@ -3144,156 +3262,93 @@ async def start_over(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     
     return GENDER
 
+async def show_previous_week_day(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Step back one day in the weekly plan."""
+    context.user_data['current_day'] = max(0, context.user_data.get('current_day', 0) - 1)
+    return await show_weekly_day(update, context)
+
+async def show_next_week_day(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
+    """Step forward one day in the weekly plan."""
+    context.user_data['current_day'] = min(len(context.user_data.get('weekly_plan', [])) - 1, 
+                                          context.user_data.get('current_day', 0) + 1)
+    return await show_weekly_day(update, context)
+
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    """Handle all button callbacks."""
+    """Handle all button callbacks (exact match, then profile steps, then prefix routes in order)."""
     query = update.callback_query
+    data = query.data
     
-    # Profile creation flow
-    if query.data == "start_profile":
-        return await start_profile_creation(update, context)
-    elif query.data.startswith("gender_"):
-        return await gender_selection(update, context)
-    elif query.data.startswith("state_"):
-        return await state_selection(update, context)
-    elif query.data.startswith("diet_"):
-        return await diet_selection(update, context)
-    elif query.data.startswith("medical_"):
-        return await medical_selection(update, context)
-    elif query.data.startswith("activity_"):
-        return await activity_selection(update, context)
-    
-    # Main menu options
-    elif query.data == "get_meal_plan":
-        return await get_meal_plan(update, context)
-    elif query.data == "quick_meal_plan":
-        return await quick_meal_plan(update, context)
-    elif query.data.startswith("meal_plan_type_"):
-        return await generate_meal_plan_by_type(update, context)
-    elif query.data == "ingredient_meal":
-        return await handle_ingredient_meal(update, context)
-    elif query.data.startswith("meal_type_"):
-        return await handle_meal_type_selection(update, context)
-    elif query.data == "log_meal":
-        return await log_meal_command(update, context)
-    elif query.data == "navigate_back":
-        return await navigate_back(update, context)
-    elif query.data.startswith("ate_"):
-        return await handle_ate_meal(update, context)
-    elif query.data.startswith("skipped_"):
-        return await handle_skipped_meal(update, context)
-    elif query.data.startswith("custom_"):
-        return await handle_custom_meal(update, context)
-    elif query.data.startswith("follow_meal_") or query.data == "log_followed_done":
-        return await handle_log_meal_followed(update, context)
-    elif query.data == "meal_type_done":
-        return await handle_meal_type_done(update, context)
-    elif query.data.startswith("skip_meal_type_"):
-        return await handle_skip_meal_type(update, context)
-    elif query.data.startswith("skip_meal_") or query.data == "log_skipped_done":
-        return await handle_log_meal_skipped(update, context)
-    elif query.data.startswith("custom_meal_input"):
-        return await handle_custom_meal_input(update, context)
-    elif query.data.startswith("extra_") or query.data == "log_extra_done" or query.data == "add_custom_extra":
-        return await handle_log_meal_extra(update, context)
-    elif query.data == "week_plan":
-        return await handle_weekly_plan(update, context)
-    elif query.data == "go_back":
-        return await go_back(update, context)
-    elif query.data == "grocery_list":
-        return await show_grocery_list(update, context)
-    elif query.data == "order_zepto":
-        return await order_on_zepto(update, context)
-    elif query.data == "update_profile":
-        return await start_profile_creation(update, context)
-    
-    # Grocery management
-    elif query.data == "manage_grocery":
-        return await manage_grocery_list(update, context)
-    elif query.data == "add_grocery_items":
-        return await add_grocery_items(update, context)
-    elif query.data == "remove_grocery_items":
-        return await remove_grocery_items(update, context)
-    elif query.data == "clear_grocery_list":
-        return await clear_grocery_list(update, context)
-    elif query.data.startswith("add_item_"):
-        return await add_grocery_item(update, context)
-    elif query.data.startswith("remove_item_"):
-        return await remove_grocery_item(update, context)
+    handler = CALLBACK_EXACT.get(data)
+    if handler:
+        return await handler(update, context)
     
-    # Cart management
-    elif query.data.startswith("cart_toggle_"):
-        return await toggle_cart_item(update, context)
-    elif query.data == "show_cart":
-        return await show_cart(update, context)
+    # Profile creation steps ("gender_male", "diet_veg", ...) route on the part before the first underscore
+    step, separator, _ = data.partition("_")
+    handler = PROFILE_STEP_HANDLERS.get(step) if separator else None
+    if handler:
+        return await handler(update, context)
     
-    # Profile management
-    elif query.data == "view_profile":
-        return await show_user_profile(update, context)
-    elif query.data == "streak_help":
-        return await show_streak_help(update, context)
-    
-    # Weekly plan navigation
-    elif query.data == "week_prev":
-        context.user_data['current_day'] = max(0, context.user_data.get('current_day', 0) - 1)
-        return await show_weekly_day(update, context)
-    elif query.data == "week_next":
-        context.user_data['current_day'] = min(len(context.user_data.get('weekly_plan', [])) - 1, 
-                                              context.user_data.get('current_day', 0) + 1)
-        return await show_weekly_day(update, context)
-    
-    # Rating system
-    elif query.data.startswith("rate_"):
-        logger.info(f"🔧 Rating button clicked: {query.data}")
-        return await handle_meal_rating(update, context)
-    
-    # Navigation
-    elif query.data == "start_over":
-        return await start_over(update, context)
+    if data.startswith(CALLBACK_PREFIXES):
+        for prefix, handler in CALLBACK_PREFIX:
+            if data.startswith(prefix):
+                return await handler(update, context)
     
     return ConversationHandler.END
 
+def normalize_meal_names(meals) -> List[str]:
+    """Get button-ready (truncated) names for suggested meals, in order."""
+    names = []
+    for i, meal in enumerate(meals):
+        if isinstance(meal, dict):
+            meal_name = meal.get('name') or meal.get('Food Item', f'Meal {i+1}')
+        else:
+            meal_name = str(meal) if str(meal).strip() else f'Meal {i+1}'
+        
+        if len(meal_name) > 30:
+            meal_name = meal_name[:27] + "..."
+        names.append(meal_name)
+    return names
+
+class MealLog:
+    """Per-conversation /logmeal state kept in context.user_data["meal_log"]."""
+    # Explicit __slots__ rather than @dataclass(slots=True), which needs Python 3.10+
+    __slots__ = ("meals", "followed_meals", "skipped_meals", "extra_items")
+    
+    def __init__(self):
+        self.meals: Dict[str, Dict[str, Any]] = {
+            meal_type: {"ate": False, "meal": None, "extra": []} for meal_type in LOG_MEAL_TYPES
+        }
+        # Sets for O(1) toggles; converted to sorted lists when saved
+        self.followed_meals: set = set()
+        self.skipped_meals: set = set()
+        self.extra_items: set = set()
+
+def get_meal_log(context: ContextTypes.DEFAULT_TYPE) -> MealLog:
+    """Get the conversation's meal log, starting a new one if missing."""
+    meal_log = context.user_data.get("meal_log")
+    if not isinstance(meal_log, MealLog):
+        meal_log = context.user_data["meal_log"] = MealLog()
+    return meal_log
+
 async def log_meal_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Start the log meal flow with individual meal type selection."""
     # Handle both command and button callbacks
-    if update.callback_query:
-        query = update.callback_query
-        user_id = query.from_user.id
-        message = query.message
-    else:
-        user_id = update.effective_user.id
-        message = update.message
+    user_id = update.effective_user.id
     
-    # Get user profile
-    user_data = user_data_cache.get(user_id)
+    # Get user profile - kept on the conversation so later /logmeal runs survive cache eviction
+    user_data = context.user_data.get("profile")
     if not user_data:
         user_data = await get_user_profile(user_id)
         if not user_data:
-            if update.callback_query:
-                await query.edit_message_text(
-                    "❌ No profile found. Please create your profile first.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                    ]])
-                )
-            else:
-                await update.message.reply_text(
-                    "❌ No profile found. Please create your profile first.",
-                    reply_markup=InlineKeyboardMarkup([[
-                        InlineKeyboardButton("🏠 Start Over", callback_data="start_over")
-                    ]])
-                )
+            await smart_reply(update, NO_PROFILE_TEXT, START_OVER_MARKUP)
             return ConversationHandler.END
+        context.user_data["profile"] = user_data
     
     # Add to navigation stack
     add_to_navigation_stack(user_id, "log_meal_start", {})
     
     # Initialize meal log in context
-    context.user_data["meal_log"] = {
-        "breakfast": {"ate": False, "meal": None, "extra": []},
-        "lunch": {"ate": False, "meal": None, "extra": []},
-        "dinner": {"ate": False, "meal": None, "extra": []},
-        "snack": {"ate": False, "meal": None, "extra": []}
-    }
+    context.user_data["meal_log"] = MealLog()
     
     # Start with breakfast
     context.user_data["current_meal_type"] = "breakfast"
@@ -3305,16 +3360,12 @@ async def show_individual_meal_selection(update: Update, context: ContextTypes.D
     """Show individual meal selection for each meal type."""
     # Handle both command and button callbacks
     if update.callback_query:
-        query = update.callback_query
-        await query.answer()
-    else:
-        query = None
+        await update.callback_query.answer()
     
     current_meal_type = context.user_data.get("current_meal_type", "breakfast")
-    meal_log = context.user_data.get("meal_log", {})
     
     # Create step indicator
-    meal_types = ["breakfast", "lunch", "dinner", "snack"]
+    meal_types = LOG_MEAL_TYPES
     current_step = meal_types.index(current_meal_type) + 1
     total_steps = len(meal_types)
     
@@ -3343,15 +3394,9 @@ async def show_individual_meal_selection(update: Update, context: ContextTypes.D
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    if query:
-        await query.edit_message_text(
-            message,
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    else:
-        # This shouldn't happen, but handle it gracefully
-        return LOG_MEAL_FOLLOWED
+    # /logmeal arrives as a typed command, so there may be no message to edit
+    sent = await smart_reply(update, message, reply_markup, parse_mode='Markdown')
+    record_rendered_screen(context, sent)
     
     return LOG_MEAL_FOLLOWED
 
@@ -3359,10 +3404,7 @@ async def show_meal_type_selection(update: Update, context: ContextTypes.DEFAULT
     """Show meals for a specific meal type."""
     # Handle both command and button callbacks
     if update.callback_query:
-        query = update.callback_query
-        await query.answer()
-    else:
-        query = None
+        await update.callback_query.answer()
     
     current_meal_type = context.user_data.get("current_meal_type", "Breakfast")
     categorized_meals = context.user_data.get("categorized_meals", {})
@@ -3371,7 +3413,7 @@ async def show_meal_type_selection(update: Update, context: ContextTypes.DEFAULT
     meals_for_type = categorized_meals.get(current_meal_type, [])
     
     # Create step indicator
-    meal_types = ["Breakfast", "Lunch", "Dinner", "Snack"]
+    meal_types = MEAL_TYPES_DISPLAY
     current_step = meal_types.index(current_meal_type) + 1
     total_steps = len(meal_types)
     
@@ -3397,10 +3439,11 @@ async def show_meal_type_selection(update: Update, context: ContextTypes.DEFAULT
     keyboard = []
     
     # Add meal buttons
-    for meal_name, meal_data in meals_for_type:
+    for i, (meal_name, meal_data) in enumerate(meals_for_type):
         # Ensure meal name is not too long for button
         display_name = meal_name[:27] + "..." if len(meal_name) > 30 else meal_name
-        keyboard.append([InlineKeyboardButton(f"✅ {display_name}", callback_data=f"follow_meal_{meal_name}")])
+        # Index into meals_for_type keeps callback_data well under Telegram's 64-byte limit
+        keyboard.append([InlineKeyboardButton(f"✅ {display_name}", callback_data=f"fm_{i}")])
     
     # Add "None" option if no meals for this type
     if not meals_for_type:
@@ -3412,15 +3455,10 @@ async def show_meal_type_selection(update: Update, context: ContextTypes.DEFAULT
     
     reply_markup = InlineKeyboardMarkup(keyboard)
     
-    if query:
-        await query.edit_message_text(
-            message,
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-    else:
-        # This shouldn't happen, but handle it gracefully
-        return LOG_MEAL_FOLLOWED
+    # /logmeal arrives as a typed command, so there may be no message to edit
+    sent = await smart_reply(update, message, reply_markup, parse_mode='Markdown')
+    # Every meal on the step starts out ✅
+    record_rendered_screen(context, sent, f"followed_{current_meal_type}", (meal_name for meal_name, _ in meals_for_type))
     
     return LOG_MEAL_FOLLOWED
 
@@ -3430,15 +3468,14 @@ async def handle_ate_meal(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     await query.answer()
     
     current_meal_type = context.user_data.get("current_meal_type", "breakfast")
-    meal_log = context.user_data.get("meal_log", {})
+    meal_log = get_meal_log(context)
     
     # Mark as ate
-    meal_log[current_meal_type]["ate"] = True
-    meal_log[current_meal_type]["meal"] = f"Suggested {current_meal_type}"
-    context.user_data["meal_log"] = meal_log
+    meal_log.meals[current_meal_type]["ate"] = True
+    meal_log.meals[current_meal_type]["meal"] = f"Suggested {current_meal_type}"
     
     # Move to next meal type
-    meal_types = ["breakfast", "lunch", "dinner", "snack"]
+    meal_types = LOG_MEAL_TYPES
     try:
         current_index = meal_types.index(current_meal_type)
         if current_index < len(meal_types) - 1:
@@ -3458,15 +3495,14 @@ async def handle_skipped_meal(update: Update, context: ContextTypes.DEFAULT_TYPE
     await query.answer()
     
     current_meal_type = context.user_data.get("current_meal_type", "breakfast")
-    meal_log = context.user_data.get("meal_log", {})
+    meal_log = get_meal_log(context)
     
     # Mark as skipped
-    meal_log[current_meal_type]["ate"] = False
-    meal_log[current_meal_type]["meal"] = None
-    context.user_data["meal_log"] = meal_log
+    meal_log.meals[current_meal_type]["ate"] = False
+    meal_log.meals[current_meal_type]["meal"] = None
     
     # Move to next meal type
-    meal_types = ["breakfast", "lunch", "dinner", "snack"]
+    meal_types = LOG_MEAL_TYPES
     try:
         current_index = meal_types.index(current_meal_type)
         if current_index < len(meal_types) - 1:
@@ -3511,7 +3547,7 @@ async def show_meal_log_summary(update: Update, context: ContextTypes.DEFAULT_TY
     query = update.callback_query
     await query.answer()
     
-    meal_log = context.user_data.get("meal_log", {})
+    meal_log = get_meal_log(context)
     
     message = "📝 **Your Meal Log Summary**\n\n"
     
@@ -3522,7 +3558,7 @@ async def show_meal_log_summary(update: Update, context: ContextTypes.DEFAULT_TY
         "snack": "🍎"
     }
     
-    for meal_type, data in meal_log.items():
+    for meal_type, data in meal_log.meals.items():
         emoji = emoji_map.get(meal_type, "🍽️")
         meal_type_display = meal_type.title()
         
@@ -3555,18 +3591,17 @@ async def handle_custom_meal_input(update: Update, context: ContextTypes.DEFAULT
     custom_meal = update.message.text.strip()
     
     waiting_for = context.user_data.get("waiting_for_custom_meal", "breakfast")
-    meal_log = context.user_data.get("meal_log", {})
+    meal_log = get_meal_log(context)
     
     # Store the custom meal
-    meal_log[waiting_for]["ate"] = True
-    meal_log[waiting_for]["meal"] = custom_meal
-    context.user_data["meal_log"] = meal_log
+    meal_log.meals[waiting_for]["ate"] = True
+    meal_log.meals[waiting_for]["meal"] = custom_meal
     
     # Clear waiting state
     context.user_data.pop("waiting_for_custom_meal", None)
     
     # Move to next meal type
-    meal_types = ["breakfast", "lunch", "dinner", "snack"]
+    meal_types = LOG_MEAL_TYPES
     try:
         current_index = meal_types.index(waiting_for)
         if current_index < len(meal_types) - 1:
@@ -3588,7 +3623,7 @@ async def handle_meal_type_done(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     
     current_meal_type = context.user_data.get("current_meal_type", "Breakfast")
-    meal_types = ["Breakfast", "Lunch", "Dinner", "Snack"]
+    meal_types = MEAL_TYPES_DISPLAY
     
     # Find next meal type
     try:
@@ -3612,14 +3647,10 @@ async def handle_skip_meal_type(update: Update, context: ContextTypes.DEFAULT_TY
     await query.answer()
     
     # Extract meal type from callback data
-    meal_type = query.data.replace("skip_meal_type_", "")
+    meal_type = query.data.removeprefix("skip_meal_type_")
     
     # Add to skipped meals
-    meal_log = context.user_data.get("meal_log", {})
-    skipped_meals = meal_log.get("skipped_meals", [])
-    skipped_meals.append(f"Skipped {meal_type}")
-    meal_log["skipped_meals"] = skipped_meals
-    context.user_data["meal_log"] = meal_log
+    get_meal_log(context).skipped_meals.add(f"Skipped {meal_type}")
     
     # Move to next meal type
     return await handle_meal_type_done(update, context)
@@ -3629,6 +3660,8 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_id = update.effective_user.id
     if user_id in user_data_cache:
         del user_data_cache[user_id]
+    user_profile_fetched_at.pop(user_id, None)
+    context.user_data.pop("profile", None)
     
     await update.message.reply_text(
         "👋 Alright, we're done here! Hit me up with /start when you're ready to try again! ✌️"
@@ -3645,39 +3678,39 @@ async def handle_log_meal_followed(update: Update, context: ContextTypes.DEFAULT
         # All meal types are done, move to extra items
         return await handle_log_meal_extra(update, context)
     
-    elif query.data.startswith("follow_meal_"):
-        # Toggle meal selection
-        meal_name = query.data.replace("follow_meal_", "")
-        meal_log = context.user_data.get("meal_log", {})
-        followed_meals = meal_log.get("followed_meals", [])
+    elif query.data.startswith("fm_"):
+        # Meals shown on the current meal type step
+        current_meal_type = context.user_data.get("current_meal_type", "Breakfast")
+        categorized_meals = context.user_data.get("categorized_meals", {})
+        meals_for_type = categorized_meals.get(current_meal_type, [])
+        
+        # Toggle meal selection (callback data carries the meal's index)
+        meal_index = int(query.data[3:])
+        if meal_index >= len(meals_for_type):
+            return LOG_MEAL_FOLLOWED
+        meal_name = meals_for_type[meal_index][0]
+        followed_meals = get_meal_log(context).followed_meals
         
         if meal_name in followed_meals:
-            followed_meals.remove(meal_name)
+            followed_meals.discard(meal_name)
         else:
-            followed_meals.append(meal_name)
-        
-        meal_log["followed_meals"] = followed_meals
-        context.user_data["meal_log"] = meal_log
+            followed_meals.add(meal_name)
         
         # Rebuild the keyboard with updated button states
-        current_meal_type = context.user_data.get("current_meal_type", "Breakfast")
-        categorized_meals = context.user_data.get("categorized_meals", {})
-        meals_for_type = categorized_meals.get(current_meal_type, [])
-        
         keyboard = []
-        for meal_name_display, meal_data in meals_for_type:
+        for i, (meal_name_display, meal_data) in enumerate(meals_for_type):
             display_name = meal_name_display[:27] + "..." if len(meal_name_display) > 30 else meal_name_display
             if meal_name_display in followed_meals:
-                keyboard.append([InlineKeyboardButton(f"✅ {display_name}", callback_data=f"follow_meal_{meal_name_display}")])
+                keyboard.append([InlineKeyboardButton(f"✅ {display_name}", callback_data=f"fm_{i}")])
             else:
-                keyboard.append([InlineKeyboardButton(f"⛔ {display_name}", callback_data=f"follow_meal_{meal_name_display}")])
+                keyboard.append([InlineKeyboardButton(f"⛔ {display_name}", callback_data=f"fm_{i}")])
         
         # Add navigation buttons
         keyboard.append([InlineKeyboardButton("✅ Done with this meal", callback_data="meal_type_done")])
         keyboard.append([InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")])
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_reply_markup(reply_markup=reply_markup)
+        shown_meals = {meal_name for meal_name, _ in meals_for_type if meal_name in followed_meals}
+        schedule_markup_edit(query, context, f"followed_{current_meal_type}", shown_meals, InlineKeyboardMarkup(keyboard))
         
         return LOG_MEAL_FOLLOWED
     
@@ -3690,71 +3723,89 @@ async def handle_log_meal_skipped(update: Update, context: ContextTypes.DEFAULT_
     
     if query.data == "log_skipped_done":
         # Move to step 3: extra items
-        keyboard = [
-            [InlineKeyboardButton("🍔 Vada Pav", callback_data="extra_vada_pav")],
-            [InlineKeyboardButton("🍦 Ice Cream", callback_data="extra_ice_cream")],
-            [InlineKeyboardButton("🥨 Chips", callback_data="extra_chips")],
-            [InlineKeyboardButton("🍕 Pizza", callback_data="extra_pizza")],
-            [InlineKeyboardButton("🍰 Cake", callback_data="extra_cake")],
-            [InlineKeyboardButton("🍫 Chocolate", callback_data="extra_chocolate")],
-            [InlineKeyboardButton("➕ Add Custom", callback_data="add_custom_extra")],
-            [InlineKeyboardButton("✅ Done", callback_data="log_extra_done")],
-            [InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")]
-        ]
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(
-            "📝 **Step 3/4: What extra items did you eat?**\n\n"
-            "Click the extra items you ate today. They'll turn ✅ when selected.\n\n"
-            "Click ✅ Done when finished.",
-            reply_markup=reply_markup,
-            parse_mode='Markdown'
-        )
-        
-        return LOG_MEAL_EXTRA
-    
-    elif query.data.startswith("skip_meal_"):
-        # Toggle meal selection
-        meal_name = query.data.replace("skip_meal_", "")
-        meal_log = context.user_data.get("meal_log", {})
-        skipped_meals = meal_log.get("skipped_meals", [])
+        return await show_extras_screen(update, context)
+    
+    elif query.data.startswith("sm_"):
+        # Names normalized once when the meals were suggested
+        meal_names = context.user_data.get("normalized_meal_names")
+        if meal_names is None:
+            meal_names = normalize_meal_names(context.user_data.get("last_suggested_meals", []))
+            context.user_data["normalized_meal_names"] = meal_names
+        
+        # Toggle meal selection (callback data carries the meal's index)
+        meal_index = int(query.data[3:])
+        if meal_index >= len(meal_names):
+            return LOG_MEAL_SKIPPED
+        meal_name = meal_names[meal_index]
+        skipped_meals = get_meal_log(context).skipped_meals
         
         if meal_name in skipped_meals:
-            skipped_meals.remove(meal_name)
+            skipped_meals.discard(meal_name)
             button_text = f"⛔ {meal_name}"
         else:
-            skipped_meals.append(meal_name)
+            skipped_meals.add(meal_name)
             button_text = f"✅ {meal_name}"
         
-        meal_log["skipped_meals"] = skipped_meals
-        context.user_data["meal_log"] = meal_log
-        
         # Rebuild the keyboard with updated button states
-        last_meals = context.user_data.get("last_suggested_meals", [])
         keyboard = []
-        for i, meal in enumerate(last_meals):
-            if isinstance(meal, dict):
-                meal_name = meal.get('name') or meal.get('Food Item', f'Meal {i+1}')
-            else:
-                meal_name = str(meal) if str(meal).strip() else f'Meal {i+1}'
-            
-            if len(meal_name) > 30:
-                meal_name = meal_name[:27] + "..."
-            
+        for i, meal_name in enumerate(meal_names):
             if meal_name in skipped_meals:
-                keyboard.append([InlineKeyboardButton(f"✅ {meal_name}", callback_data=f"skip_meal_{meal_name}")])
+                keyboard.append([InlineKeyboardButton(f"✅ {meal_name}", callback_data=f"sm_{i}")])
             else:
-                keyboard.append([InlineKeyboardButton(f"⛔ {meal_name}", callback_data=f"skip_meal_{meal_name}")])
+                keyboard.append([InlineKeyboardButton(f"⛔ {meal_name}", callback_data=f"sm_{i}")])
         
         keyboard.append([InlineKeyboardButton("✅ Done", callback_data="log_skipped_done")])
         keyboard.append([InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")])
         
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_reply_markup(reply_markup=reply_markup)
+        schedule_markup_edit(query, context, "skipped", skipped_meals, InlineKeyboardMarkup(keyboard))
         
         return LOG_MEAL_SKIPPED
 
+# Preset extra items on the meal log extras step: (button text, callback_data)
+EXTRA_ITEMS = (
+    ("🍔 Vada Pav", "extra_vada_pav"),
+    ("🍦 Ice Cream", "extra_ice_cream"),
+    ("🥨 Chips", "extra_chips"),
+    ("🍕 Pizza", "extra_pizza"),
+    ("🍰 Cake", "extra_cake"),
+    ("🍫 Chocolate", "extra_chocolate")
+)
+EXTRA_ITEM_NAMES = {item_data: item_data.removeprefix("extra_").replace("_", " ").title() for _, item_data in EXTRA_ITEMS}
+EXTRAS_ACTION_ROWS = (
+    (InlineKeyboardButton("➕ Add Custom", callback_data="add_custom_extra"),),
+    (InlineKeyboardButton("✅ Done", callback_data="log_extra_done"),),
+    (InlineKeyboardButton("⬅️ Go Back", callback_data="go_back"),)
+)
+# Extras keyboard as first shown, before any toggles
+EXTRAS_MARKUP = InlineKeyboardMarkup((
+    *((InlineKeyboardButton(item_text, callback_data=item_data),) for item_text, item_data in EXTRA_ITEMS),
+    *EXTRAS_ACTION_ROWS
+))
+EXTRAS_PROMPT = (
+    "📝 **Step 3/4: What extra items did you eat?**\n\n"
+    "Click the extra items you ate today. They'll turn ✅ when selected.\n\n"
+    "Click ✅ Done when finished."
+)
+
+def build_extras_markup(selected_items) -> InlineKeyboardMarkup:
+    """Build the extras keyboard with ✅/⛔ marks for the selected items."""
+    if not selected_items:
+        return EXTRAS_MARKUP
+    return InlineKeyboardMarkup((
+        *(
+            (InlineKeyboardButton(f"{'✅' if EXTRA_ITEM_NAMES[item_data] in selected_items else '⛔'} {item_text}", callback_data=item_data),)
+            for item_text, item_data in EXTRA_ITEMS
+        ),
+        *EXTRAS_ACTION_ROWS
+    ))
+
+async def show_extras_screen(update: Update, context: ContextTypes.DEFAULT_TYPE, intro: str = "") -> int:
+    """Show the extra items step, reflecting any items already selected."""
+    selected_items = get_meal_log(context).extra_items
+    sent = await smart_reply(update, intro + EXTRAS_PROMPT, build_extras_markup(selected_items), parse_mode='Markdown')
+    record_rendered_screen(context, sent, "extras", selected_items)
+    return LOG_MEAL_EXTRA
+
 async def handle_log_meal_extra(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle extra item selection."""
     query = update.callback_query
@@ -3769,50 +3820,23 @@ async def handle_log_meal_extra(update: Update, context: ContextTypes.DEFAULT_TY
         await query.edit_message_text(
             "📝 **Add Custom Extra Item**\n\n"
             "Type the name of the extra item you ate:",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")
-            ]])
+            reply_markup=GO_BACK_MARKUP
         )
+        record_rendered_screen(context, query.message)
         return LOG_MEAL_CUSTOM
     
     elif query.data.startswith("extra_"):
         # Toggle extra item selection
-        item_name = query.data.replace("extra_", "").replace("_", " ").title()
-        meal_log = context.user_data.get("meal_log", {})
-        extra_items = meal_log.get("extra_items", [])
+        item_name = EXTRA_ITEM_NAMES.get(query.data) or query.data.removeprefix("extra_").replace("_", " ").title()
+        extra_items = get_meal_log(context).extra_items
         
         if item_name in extra_items:
-            extra_items.remove(item_name)
+            extra_items.discard(item_name)
         else:
-            extra_items.append(item_name)
-        
-        meal_log["extra_items"] = extra_items
-        context.user_data["meal_log"] = meal_log
+            extra_items.add(item_name)
         
         # Rebuild the keyboard with updated button states
-        keyboard = []
-        extra_items_list = [
-            ("🍔 Vada Pav", "extra_vada_pav"),
-            ("🍦 Ice Cream", "extra_ice_cream"),
-            ("🥨 Chips", "extra_chips"),
-            ("🍕 Pizza", "extra_pizza"),
-            ("🍰 Cake", "extra_cake"),
-            ("🍫 Chocolate", "extra_chocolate")
-        ]
-        
-        for item_text, item_data in extra_items_list:
-            item_name = item_data.replace("extra_", "").replace("_", " ").title()
-            if item_name in extra_items:
-                keyboard.append([InlineKeyboardButton(f"✅ {item_text}", callback_data=item_data)])
-            else:
-                keyboard.append([InlineKeyboardButton(f"⛔ {item_text}", callback_data=item_data)])
-        
-        keyboard.append([InlineKeyboardButton("➕ Add Custom", callback_data="add_custom_extra")])
-        keyboard.append([InlineKeyboardButton("✅ Done", callback_data="log_extra_done")])
-        keyboard.append([InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")])
-        
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await query.edit_message_reply_markup(reply_markup=reply_markup)
+        schedule_markup_edit(query, context, "extras", extra_items, build_extras_markup(extra_items))
         
         return LOG_MEAL_EXTRA
 
@@ -3824,44 +3848,36 @@ async def handle_log_meal_custom(update: Update, context: ContextTypes.DEFAULT_T
     if not custom_item:
         await update.message.reply_text(
             "❌ Please enter a valid item name.",
-            reply_markup=InlineKeyboardMarkup([[
-                InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")
-            ]])
+            reply_markup=GO_BACK_MARKUP
         )
         return LOG_MEAL_CUSTOM
     
     # Add custom item to meal log
-    meal_log = context.user_data.get("meal_log", {})
-    extra_items = meal_log.get("extra_items", [])
-    extra_items.append(custom_item)
-    meal_log["extra_items"] = extra_items
-    context.user_data["meal_log"] = meal_log
+    get_meal_log(context).extra_items.add(custom_item)
     
     # Go back to extra items selection
-    keyboard = [
-        [InlineKeyboardButton("🍔 Vada Pav", callback_data="extra_vada_pav")],
-        [InlineKeyboardButton("🍦 Ice Cream", callback_data="extra_ice_cream")],
-        [InlineKeyboardButton("🥨 Chips", callback_data="extra_chips")],
-        [InlineKeyboardButton("🍕 Pizza", callback_data="extra_pizza")],
-        [InlineKeyboardButton("🍰 Cake", callback_data="extra_cake")],
-        [InlineKeyboardButton("🍫 Chocolate", callback_data="extra_chocolate")],
-        [InlineKeyboardButton("➕ Add Custom", callback_data="add_custom_extra")],
-        [InlineKeyboardButton("✅ Done", callback_data="log_extra_done")],
-        [InlineKeyboardButton("⬅️ Go Back", callback_data="go_back")]
-    ]
-    
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
-    await update.message.reply_text(
-        f"✅ Added '{custom_item}' to your extra items!\n\n"
-        "📝 **Step 3/4: What extra items did you eat?**\n\n"
-        "Click the extra items you ate today. They'll turn ✅ when selected.\n\n"
-        "Click ✅ Done when finished.",
-        reply_markup=reply_markup,
-        parse_mode='Markdown'
-    )
-    
-    return LOG_MEAL_EXTRA
+    return await show_extras_screen(update, context, f"✅ Added '{custom_item}' to your extra items!\n\n")
+
+async def persist_meal_log(user_id: int, today: str, log_data: Dict[str, Any], points_earned: int):
+    """Save a day's meal log and add its points to the user's total."""
+    try:
+        user_ref = db.collection('users').document(str(user_id))
+        
+        # Save meal log and update total points - independent documents, so the
+        # two blocking RPCs run concurrently off the event loop. The points update
+        # is an atomic server-side add that creates the field if missing.
+        await asyncio.gather(
+            asyncio.to_thread(user_ref.collection('meal_logs').document(today).set, log_data),
+            asyncio.to_thread(user_ref.set, {'total_points': firestore.Increment(points_earned)}, merge=True)
+        )
+        
+        logger.info(f"✅ Meal log saved for user {user_id}, earned {points_earned} points")
+    except Exception as e:
+        logger.error(f"❌ Error saving meal log: {e}")
+
+def format_items(items) -> str:
+    """Comma-separated items, or 'None' when there are none."""
+    return ', '.join(items) if items else 'None'
 
 async def save_meal_log_and_show_confirmation(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Save meal log to Firebase and show confirmation."""
@@ -3869,46 +3885,32 @@ async def save_meal_log_and_show_confirmation(update: Update, context: ContextTy
     user_id = query.from_user.id
     
     # Get meal log data
-    meal_log = context.user_data.get("meal_log", {})
+    meal_log = get_meal_log(context)
     
     # Generate random points (3-8)
-    import random
     points_earned = random.randint(3, 8)
     
-    # Add timestamp
-    from datetime import datetime
-    today = datetime.now().strftime("%Y-%m-%d")
-    timestamp = datetime.now().isoformat()
+    # Add timestamp (one clock read so the log date and timestamp agree)
+    now = datetime.now()
+    today = now.strftime("%Y-%m-%d")
+    timestamp = now.isoformat()
     
-    # Prepare log data
+    # Prepare log data (Firestore can't store sets)
+    followed_meals = sorted(meal_log.followed_meals)
+    skipped_meals = sorted(meal_log.skipped_meals)
+    extra_items = sorted(meal_log.extra_items)
     log_data = {
-        "followed_meals": meal_log.get("followed_meals", []),
-        "skipped_meals": meal_log.get("skipped_meals", []),
-        "extra_items": meal_log.get("extra_items", []),
+        "followed_meals": followed_meals,
+        "skipped_meals": skipped_meals,
+        "extra_items": extra_items,
         "points_earned": points_earned,
         "timestamp": timestamp
     }
     
-    # Save to Firebase
+    # Save to Firebase in the background - the confirmation doesn't depend on the write,
+    # and the application keeps a reference to the task until it finishes
     if FIREBASE_AVAILABLE and db:
-        try:
-            # Save meal log
-            await db.collection('users').document(str(user_id)).collection('meal_logs').document(today).set(log_data)
-            
-            # Update total points
-            user_ref = db.collection('users').document(str(user_id))
-            user_doc = await user_ref.get()
-            
-            if user_doc.exists:
-                current_points = user_doc.to_dict().get('total_points', 0)
-                new_total = current_points + points_earned
-                await user_ref.update({'total_points': new_total})
-            else:
-                await user_ref.set({'total_points': points_earned})
-            
-            logger.info(f"✅ Meal log saved for user {user_id}, earned {points_earned} points")
-        except Exception as e:
-            logger.error(f"❌ Error saving meal log: {e}")
+        context.application.create_task(persist_meal_log(user_id, today, log_data, points_earned))
     else:
         logger.warning(f"⚠️ Firebase not available for user {user_id}")
     
@@ -3916,18 +3918,115 @@ async def save_meal_log_and_show_confirmation(update: Update, context: ContextTy
     await query.edit_message_text(
         f"✅ **Meal logged for today!**\n\n"
         f"You earned *{points_earned}* points 🎉\n\n"
-        f"**Followed:** {', '.join(meal_log.get('followed_meals', [])) or 'None'}\n"
-        f"**Skipped:** {', '.join(meal_log.get('skipped_meals', [])) or 'None'}\n"
-        f"**Extra:** {', '.join(meal_log.get('extra_items', [])) or 'None'}",
+        f"**Followed:** {format_items(followed_meals)}\n"
+        f"**Skipped:** {format_items(skipped_meals)}\n"
+        f"**Extra:** {format_items(extra_items)}",
         reply_markup=InlineKeyboardMarkup([[
             InlineKeyboardButton("🏠 Main Menu", callback_data="go_back")
         ]]),
         parse_mode='Markdown'
     )
+    record_rendered_screen(context, query.message)
     
     # Return to MEAL_PLAN state so the go_back button works properly
     return MEAL_PLAN
 
+# Callback routing for button_handler - exact callback_data values
+CALLBACK_EXACT = {
+    # Profile creation flow
+    "start_profile": start_profile_creation,
+    "update_profile": start_profile_creation,
+    
+    # Main menu options
+    "get_meal_plan": get_meal_plan,
+    "quick_meal_plan": quick_meal_plan,
+    "ingredient_meal": handle_ingredient_meal,
+    "log_meal": log_meal_command,
+    "navigate_back": navigate_back,
+    "log_followed_done": handle_log_meal_followed,
+    "meal_type_done": handle_meal_type_done,
+    "log_skipped_done": handle_log_meal_skipped,
+    "log_extra_done": handle_log_meal_extra,
+    "add_custom_extra": handle_log_meal_extra,
+    "week_plan": handle_weekly_plan,
+    "go_back": go_back,
+    "grocery_list": show_grocery_list,
+    "order_zepto": order_on_zepto,
+    
+    # Grocery management
+    "manage_grocery": manage_grocery_list,
+    "add_grocery_items": add_grocery_items,
+    "remove_grocery_items": remove_grocery_items,
+    "clear_grocery_list": clear_grocery_list,
+    
+    # Cart management
+    "show_cart": show_cart,
+    
+    # Profile management
+    "view_profile": show_user_profile,
+    "streak_help": show_streak_help,
+    
+    # Weekly plan navigation
+    "week_prev": show_previous_week_day,
+    "week_next": show_next_week_day,
+    
+    # Navigation
+    "start_over": start_over
+}
+
+# Profile creation steps, keyed by the callback data before the first underscore
+PROFILE_STEP_HANDLERS = {
+    "gender": gender_selection,
+    "state": state_selection,
+    "diet": diet_selection,
+    "medical": medical_selection,
+    "activity": activity_selection
+}
+
+# Prefix routes, checked in order (longer prefixes before shorter ones they overlap)
+CALLBACK_PREFIX = (
+    ("meal_plan_type_", generate_meal_plan_by_type),
+    ("meal_type_", handle_meal_type_selection),
+    ("ate_", handle_ate_meal),
+    ("skipped_", handle_skipped_meal),
+    ("custom_", handle_custom_meal),
+    ("fm_", handle_log_meal_followed),
+    ("skip_meal_type_", handle_skip_meal_type),
+    ("sm_", handle_log_meal_skipped),
+    ("extra_", handle_log_meal_extra),
+    ("add_item:", add_grocery_item),
+    ("remove_item:", remove_grocery_item),
+    ("cart_toggle:", toggle_cart_item),
+    ("rate_", handle_meal_rating)
+)
+CALLBACK_PREFIXES = tuple(prefix for prefix, _ in CALLBACK_PREFIX)
+
+# Conversation states, built once; every state routes buttons through the same handler
+BUTTON_CALLBACK_HANDLER = CallbackQueryHandler(button_handler)
+TEXT_INPUT = filters.TEXT & ~filters.COMMAND
+CONVERSATION_STATES = {
+    NAME: [BUTTON_CALLBACK_HANDLER, MessageHandler(TEXT_INPUT, handle_name)],
+    AGE: [BUTTON_CALLBACK_HANDLER, MessageHandler(TEXT_INPUT, handle_age)],
+    GENDER: [BUTTON_CALLBACK_HANDLER],
+    STATE: [BUTTON_CALLBACK_HANDLER],
+    DIET_TYPE: [BUTTON_CALLBACK_HANDLER],
+    MEDICAL_CONDITION: [BUTTON_CALLBACK_HANDLER, MessageHandler(TEXT_INPUT, handle_custom_medical)],
+    ACTIVITY_LEVEL: [BUTTON_CALLBACK_HANDLER],
+    MEAL_PLAN: [BUTTON_CALLBACK_HANDLER],
+    WEEK_PLAN: [BUTTON_CALLBACK_HANDLER],
+    GROCERY_LIST: [BUTTON_CALLBACK_HANDLER],
+    RATING: [BUTTON_CALLBACK_HANDLER],
+    GROCERY_MANAGE: [BUTTON_CALLBACK_HANDLER],
+    CART: [BUTTON_CALLBACK_HANDLER],
+    PROFILE: [BUTTON_CALLBACK_HANDLER],
+    INGREDIENTS: [BUTTON_CALLBACK_HANDLER, MessageHandler(TEXT_INPUT, handle_ingredients_input)],
+    MEAL_TYPE: [BUTTON_CALLBACK_HANDLER],
+    LOG_MEAL_FOLLOWED: [BUTTON_CALLBACK_HANDLER],
+    LOG_MEAL_SKIPPED: [BUTTON_CALLBACK_HANDLER],
+    LOG_MEAL_EXTRA: [BUTTON_CALLBACK_HANDLER],
+    LOG_MEAL_CUSTOM: [BUTTON_CALLBACK_HANDLER, MessageHandler(TEXT_INPUT, handle_log_meal_custom)]
+}
+
 def main() -> None:
     """Start the bot with comprehensive error handling."""
     
@@ -3941,7 +4040,7 @@ def main() -> None:
             return
         
         # Validate bot token format
-        if not BOT_TOKEN.count(':') == 1 or len(BOT_TOKEN.split(':')) != 2:
+        if not BOT_TOKEN_PATTERN.match(BOT_TOKEN):
             print("❌ ERROR: Invalid bot token format!")
             print("🔑 Token should be in format: 1234567890:ABCdefGHIjklMNOpqrsTUVwxyz")
             return
@@ -3952,51 +4051,7 @@ def main() -> None:
         # Add conversation handler
         conv_handler = ConversationHandler(
             entry_points=[CommandHandler("start", start)],
-            states={
-                NAME: [
-                    CallbackQueryHandler(button_handler),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_name)
-                ],
-                AGE: [
-                    CallbackQueryHandler(button_handler),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_age)
-                ],
-                GENDER: [CallbackQueryHandler(button_handler)],
-                STATE: [CallbackQueryHandler(button_handler)],
-                DIET_TYPE: [CallbackQueryHandler(button_handler)],
-                MEDICAL_CONDITION: [
-                    CallbackQueryHandler(button_handler),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_medical)
-                ],
-                ACTIVITY_LEVEL: [CallbackQueryHandler(button_handler)],
-                MEAL_PLAN: [CallbackQueryHandler(button_handler)],
-                WEEK_PLAN: [CallbackQueryHandler(button_handler)],
-                GROCERY_LIST: [CallbackQueryHandler(button_handler)],
-                RATING: [CallbackQueryHandler(button_handler)],
-                GROCERY_MANAGE: [CallbackQueryHandler(button_handler)],
-                CART: [CallbackQueryHandler(button_handler)],
-                PROFILE: [CallbackQueryHandler(button_handler)],
-                INGREDIENTS: [
-                    CallbackQueryHandler(button_handler),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_ingredients_input)
-                ],
-                MEAL_TYPE: [
-                    CallbackQueryHandler(button_handler)
-                ],
-                LOG_MEAL_FOLLOWED: [
-                    CallbackQueryHandler(button_handler)
-                ],
-                LOG_MEAL_SKIPPED: [
-                    CallbackQueryHandler(button_handler)
-                ],
-                LOG_MEAL_EXTRA: [
-                    CallbackQueryHandler(button_handler)
-                ],
-                LOG_MEAL_CUSTOM: [
-                    CallbackQueryHandler(button_handler),
-                    MessageHandler(filters.TEXT & ~filters.COMMAND, handle_log_meal_custom)
-                ],
-            },
+            states=CONVERSATION_STATES,
             fallbacks=[CommandHandler("cancel", cancel)],
             per_message=False,
         )